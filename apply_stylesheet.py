@@ -0,0 +1,49 @@
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.transform import STYLESHEETS, get_transform, get_transform_operation, parse_param
+
+def process_files(directory, product_type, stylesheet, params=None, discovery=None, execution=None, instrumentation=None):
+    """
+    Process XML files, applying the compiled stylesheet to each record
+    and writing the records that changed.
+    """
+    # Fail on a broken stylesheet before any file is processed
+    get_transform(stylesheet)
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+
+    for file_result in stats.track(process_in_parallel(xml_files, get_transform_operation(stylesheet, params), **(execution or {}))):
+        if file_result.error:
+            print_failure(file_result)
+        elif file_result.result:
+            stats.count('written')
+        else:
+            stats.count('unchanged')
+    stats.finish()
+
+DESCRIPTION = 'Apply an XSLT stylesheet to the XML files, compiled once per worker.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, resumable=True)
+    parser.add_argument('--stylesheet', type=str, required=True, help=f'Path to a stylesheet, or one of the shipped stylesheets ({", ".join(STYLESHEETS)})')
+    parser.add_argument('--param', type=parse_param, action='append', default=[], help='Stylesheet parameter as NAME=VALUE, can be repeated (e.g. collections=NBS,SIOS)')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, args.stylesheet, dict(args.param), get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
+
+def main():
+    """
+    Main function to parse arguments and initiate the process.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.summary import ArchiveStatistics, summarize_record, write_statistics
+
+def process_files(directory, product_type, json_path=None, discovery=None, execution=None, instrumentation=None):
+    """
+    Summarize the XML files in the workers and count the summaries into the archive statistics.
+    Returns the ArchiveStatistics.
+    """
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+    statistics = ArchiveStatistics()
+    for file_result in stats.track(process_in_parallel(xml_files, summarize_record, **(execution or {}))):
+        if file_result.error:
+            print_failure(file_result)
+        else:
+            statistics.add(file_result.result)
+    stats.finish()
+    write_statistics(statistics, json_path)
+    return statistics
+
+DESCRIPTION = 'Count the MMD records by mission, level and metadata_status, collection, ODATA host and last_metadata_update format.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser)
+    parser.add_argument('--json', type=str, default=None, help='Also write the statistics as JSON to this file')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, args.json, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
+
+def main():
+    """
+    Main function to parse arguments and initiate the process.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Benchmarks for the MMD maintenance scripts, run against a synthetic archive.
+
+    python -m bench.corpus /tmp/mmd_corpus --files 5000
+    python -m bench.run_benchmarks --files 5000 --output results.json
+    python -m bench.compare before.json after.json
+"""
@@ -0,0 +1,33 @@
+import argparse
+import json
+
+
+def load_results(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {result['name']: result for result in report['results']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark reports, e.g. from before and after a change.')
+    parser.add_argument('before', type=str, help='JSON report of the baseline')
+    parser.add_argument('after', type=str, help='JSON report to compare with the baseline')
+    args = parser.parse_args()
+
+    before_report, before = load_results(args.before)
+    after_report, after = load_results(args.after)
+    print(f"{'benchmark':45} {'before files/s':>15} {'after files/s':>15} {'speedup':>8} {'rss MB':>8}")
+    print(f"{'':45} {before_report.get('commit') or '':>15} {after_report.get('commit') or '':>15}")
+    names = list(before) + [name for name in after if name not in before]
+    for name in names:
+        old = (before.get(name) or {}).get('files_per_sec')
+        new = (after.get(name) or {}).get('files_per_sec')
+        speedup = f"{new / old:.2f}x" if old and new else '-'
+        rss = (after.get(name) or before.get(name))['peak_rss_kb'] / 1024
+        old_text = f"{old:.1f}" if old else '-'
+        new_text = f"{new:.1f}" if new else '-'
+        print(f"{name:45} {old_text:>15} {new_text:>15} {speedup:>8} {rss:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+
+RECORD_TEMPLATE = '''<?xml version='1.0' encoding='UTF-8'?>
+<mmd:mmd xmlns:mmd="http://www.met.no/schema/mmd" xmlns:gml="http://www.opengis.net/gml">
+  <mmd:metadata_identifier>no.met:{identifier}</mmd:metadata_identifier>
+  <mmd:title xml:lang="en">{name}</mmd:title>
+  <mmd:abstract xml:lang="en">{platform} {instrument} product {name}, ingested from the ESA Copernicus ground segment.</mmd:abstract>
+  <mmd:metadata_status>{status}</mmd:metadata_status>
+  <mmd:dataset_production_status>Complete</mmd:dataset_production_status>
+{collections}  <mmd:last_metadata_update>{last_metadata_update}</mmd:last_metadata_update>
+  <mmd:temporal_extent>
+    <mmd:start_date>{start}</mmd:start_date>
+    <mmd:end_date>{end}</mmd:end_date>
+  </mmd:temporal_extent>
+  <mmd:iso_topic_category>climatologyMeteorologyAtmosphere</mmd:iso_topic_category>
+  <mmd:keywords vocabulary="GCMDSK">
+    <mmd:keyword>EARTH SCIENCE &gt; SPECTRAL/ENGINEERING &gt; SENSOR CHARACTERISTICS</mmd:keyword>
+  </mmd:keywords>
+  <mmd:operational_status>Operational</mmd:operational_status>
+  <mmd:dataset_language>en</mmd:dataset_language>
+  <mmd:geographic_extent>
+    <mmd:rectangle srsName="EPSG:4326">
+      <mmd:north>{north:.6f}</mmd:north>
+      <mmd:south>{south:.6f}</mmd:south>
+      <mmd:east>{east:.6f}</mmd:east>
+      <mmd:west>{west:.6f}</mmd:west>
+    </mmd:rectangle>
+  </mmd:geographic_extent>
+  <mmd:access_constraint>Open</mmd:access_constraint>
+  <mmd:use_constraint>
+    <mmd:identifier>CC-BY-4.0</mmd:identifier>
+    <mmd:resource>http://spdx.org/licenses/CC-BY-4.0</mmd:resource>
+  </mmd:use_constraint>
+  <mmd:data_center>
+    <mmd:data_center_name>
+      <mmd:short_name>MET/NBS</mmd:short_name>
+      <mmd:long_name>Norwegian Meteorological Institute / Nasjonalt Bakkesegment</mmd:long_name>
+    </mmd:data_center_name>
+    <mmd:data_center_url>https://met.no</mmd:data_center_url>
+  </mmd:data_center>
+  <mmd:data_access>
+    <mmd:type>ODATA</mmd:type>
+    <mmd:description>Open Data Protocol.</mmd:description>
+    <mmd:resource>https://{odata_host}/odata/v1/Products('{uuid}')/$value</mmd:resource>
+  </mmd:data_access>
+  <mmd:data_access>
+    <mmd:type>HTTP</mmd:type>
+    <mmd:description>Direct download of file</mmd:description>
+    <mmd:resource>https://nbstds.met.no/thredds/fileServer/NBS/{mission}/{date_path}/{name}.nc</mmd:resource>
+  </mmd:data_access>
+  <mmd:data_access>
+    <mmd:type>OPeNDAP</mmd:type>
+    <mmd:description>Open-source Project for a Network Data Access Protocol</mmd:description>
+    <mmd:resource>https://nbstds.met.no/thredds/dodsC/NBS/{mission}/{date_path}/{name}.nc</mmd:resource>
+  </mmd:data_access>
+  <mmd:related_information>
+    <mmd:type>Dataset landing page</mmd:type>
+    <mmd:description>Dataset landing page</mmd:description>
+    <mmd:resource>https://nbstds.met.no/thredds/catalog/NBS/{mission}/{date_path}/catalog.html?dataset=NBS/{mission}/{date_path}/{name}.nc</mmd:resource>
+  </mmd:related_information>
+  <mmd:storage_information>
+    <mmd:file_name>{name}.nc</mmd:file_name>
+    <mmd:file_location>/lustre/storeB/project/NBS2/sentinel/{mission}/{date_path}</mmd:file_location>
+    <mmd:file_format>NetCDF-CF</mmd:file_format>
+  </mmd:storage_information>
+  <mmd:platform>
+    <mmd:short_name>{platform}</mmd:short_name>
+    <mmd:long_name>{platform}</mmd:long_name>
+    <mmd:resource>https://www.wmo-sat.info/oscar/satellites/view/{platform_oscar}</mmd:resource>
+    <mmd:instrument>
+      <mmd:short_name>{instrument}</mmd:short_name>
+      <mmd:long_name>{instrument_long}</mmd:long_name>
+      <mmd:resource>https://www.wmo-sat.info/oscar/instruments/view/{instrument_oscar}</mmd:resource>
+      <mmd:mode>{mode}</mmd:mode>
+    </mmd:instrument>
+  </mmd:platform>
+</mmd:mmd>
+'''
+
+UPDATE_TEMPLATE = '''
+    <mmd:update>
+      <mmd:datetime>{datetime}</mmd:datetime>
+      <mmd:type>Created</mmd:type>
+      <mmd:note/>
+    </mmd:update>
+  '''
+
+PLATFORMS = {
+    'S1A': ('Sentinel-1A', 'sentinel_1a', 'SAR-C', 'Synthetic Aperture Radar (C-band)', 'sar_c_sentinel_1'),
+    'S1B': ('Sentinel-1B', 'sentinel_1b', 'SAR-C', 'Synthetic Aperture Radar (C-band)', 'sar_c_sentinel_1'),
+    'S2A': ('Sentinel-2A', 'sentinel_2a', 'MSI', 'Multi-Spectral Imager', 'msi_sentinel_2a'),
+    'S2B': ('Sentinel-2B', 'sentinel_2b', 'MSI', 'Multi-Spectral Imager', 'msi_sentinel_2b'),
+}
+
+
+def _product_name(rng, mission, sensing):
+    """
+    A product name following the Sentinel naming conventions.
+    Returns (name, instrument mode).
+    """
+    stamp = sensing.strftime('%Y%m%dT%H%M%S')
+    if mission.startswith('S1'):
+        mode = rng.choice(['IW', 'EW'])
+        product = rng.choice(['GRDH_1SDV', 'GRDM_1SDH', 'SLC__1SDV'])
+        stop = (sensing + timedelta(seconds=25)).strftime('%Y%m%dT%H%M%S')
+        absolute_orbit = rng.randint(1000, 55000)
+        return f"{mission}_{mode}_{product}_{stamp}_{stop}_{absolute_orbit:06d}_{rng.randint(0, 0xFFFFFF):06X}_{rng.randint(0, 0xFFFF):04X}", mode
+    relative_orbit = rng.randint(1, 143)
+    tile = f"T{rng.randint(28, 38)}{rng.choice('UVWX')}{rng.choice('LMNPQ')}{rng.choice('ABCDEFGH')}"
+    if sensing.year <= 2016 and rng.random() < 0.3:
+        # Old products used the long OPER naming
+        generated = (sensing + timedelta(hours=rng.randint(1, 30))).strftime('%Y%m%dT%H%M%S')
+        return f"{mission}_OPER_PRD_MSIL1C_PDMC_{generated}_R{relative_orbit:03d}_V{stamp}_{stamp}", 'OPER'
+    level = rng.choice(['MSIL1C', 'MSIL1C', 'MSIL2A'])
+    baseline = rng.choice(['N0208', 'N0209', 'N0400', 'N0500', 'N0510'])
+    generated = (sensing + timedelta(hours=rng.randint(1, 48))).strftime('%Y%m%dT%H%M%S')
+    return f"{mission}_{level}_{stamp}_{baseline}_R{relative_orbit:03d}_{tile}_{generated}", level[3:]
+
+
+def generate_record(rng, mission, sensing):
+    """
+    Generate the name and the XML text of one synthetic MMD record.
+    """
+    name, mode = _product_name(rng, mission, sensing)
+    platform, platform_oscar, instrument, instrument_long, instrument_oscar = PLATFORMS[mission]
+
+    # Extents spread over the Arctic and north Atlantic, some outside the NBS area
+    south = rng.uniform(45.0, 84.0)
+    west = rng.uniform(-45.0, 95.0)
+    north = min(south + rng.uniform(0.9, 4.0), 90.0)
+    east = west + rng.uniform(1.0, 12.0)
+
+    if rng.random() < 0.25:
+        # Legacy format, the datetime directly as text
+        last_metadata_update = (sensing + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    else:
+        last_metadata_update = UPDATE_TEMPLATE.format(datetime=(sensing + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+    draw = rng.random()
+    if draw < 0.1:
+        collections = ''
+    elif draw < 0.3:
+        collections = '  <mmd:collection>SIOS</mmd:collection>\n  <mmd:collection>NBS</mmd:collection>\n'
+    else:
+        collections = '  <mmd:collection>NBS</mmd:collection>\n'
+
+    text = RECORD_TEMPLATE.format(
+        identifier=uuid.UUID(int=rng.getrandbits(128)),
+        uuid=uuid.UUID(int=rng.getrandbits(128)),
+        name=name,
+        mission=mission,
+        date_path=sensing.strftime('%Y/%m/%d'),
+        status='Active' if rng.random() < 0.85 else 'Inactive',
+        collections=collections,
+        last_metadata_update=last_metadata_update,
+        start=sensing.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        end=(sensing + timedelta(seconds=25)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        north=north, south=south, east=east, west=west,
+        odata_host=rng.choice(['colhub.met.no', 'colhub-archive.met.no', 'colhub-archive.met.no']),
+        platform=platform, platform_oscar=platform_oscar,
+        instrument=instrument, instrument_long=instrument_long, instrument_oscar=instrument_oscar,
+        mode=mode,
+    )
+    return name, text
+
+
+def generate_corpus(directory, files=1000, seed=0, nc_fraction=0.5):
+    """
+    Write a synthetic archive of MMD records below directory, laid out as
+    <mission>/<year>/<month>/<day>/metadata/<product>.xml with the .nc file
+    (for nc_fraction of the products) in the day directory.
+    Returns the list of XML files written.
+    """
+    rng = random.Random(seed)
+    start = datetime(2015, 6, 23)
+    span = (datetime(2023, 12, 31) - start).total_seconds()
+    xml_files = []
+    for i in range(files):
+        mission = rng.choice(list(PLATFORMS))
+        sensing = start + timedelta(seconds=rng.uniform(0, span))
+        name, text = generate_record(rng, mission, sensing)
+        day_directory = os.path.join(str(directory), mission, sensing.strftime('%Y'), sensing.strftime('%m'), sensing.strftime('%d'))
+        metadata_directory = os.path.join(day_directory, 'metadata')
+        os.makedirs(metadata_directory, exist_ok=True)
+        xml_file = os.path.join(metadata_directory, f"{name}.xml")
+        with open(xml_file, 'w') as f:
+            f.write(text)
+        if rng.random() < nc_fraction:
+            open(os.path.join(day_directory, f"{name}.nc"), 'w').close()
+        xml_files.append(xml_file)
+    return xml_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic archive of MMD records for benchmarking.')
+    parser.add_argument('directory', type=str, help='Directory to write the archive to')
+    parser.add_argument('--files', type=int, default=1000, help='Number of MMD records (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed gives the same archive (default: 0)')
+    args = parser.parse_args()
+    xml_files = generate_corpus(args.directory, args.files, args.seed)
+    print(f"Wrote {len(xml_files)} MMD records to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
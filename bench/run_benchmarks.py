@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date, datetime, timezone
+
+from bench.corpus import generate_corpus
+from lib.discovery import find_xml_files
+from lib.reader import read_fields
+from lib.transform import get_transform
+from lib.utils import MMD, get_xpath
+
+# The scripts to benchmark: module name, the call to process_files and the
+# discovery arguments selecting the files the script processes
+SCRIPTS = {
+    'check_mmd_collection': (lambda module, directory, execution: module.process_files(directory, 'S', execution=execution), {}),
+    'clean_mmd_records': (lambda module, directory, execution: module.process_files(directory, 'S', execution=execution), {'metadata_only': True}),
+    'list_products_ouside_polygon': (lambda module, directory, execution: module.process_files(directory, 'S', execution=execution), {}),
+    'update_mmd_collection': (lambda module, directory, execution: module.process_files(directory, 'S', execution=execution), {}),
+    'update_odata_access_url': (lambda module, directory, execution: module.process_files(directory, 'S', execution=execution), {}),
+    'update_last_metadata_update': (lambda module, directory, execution: module.process_files(directory, 'S', execution=execution), {}),
+    'set_old_S2_L1C_products_to_active': (lambda module, directory, execution: module.process_files(directory, execution=execution), {'product_type': 'S2', 'levels': ('L1C',), 'end_date': date(2020, 12, 31)}),
+    'set_old_S2_L1C_products_to_inactive': (lambda module, directory, execution: module.process_files(directory, execution=execution), {'product_type': 'S2', 'levels': ('L1C',), 'end_date': date(2020, 12, 31)}),
+    'set_old_S2_OPER_products_to_inactive': (lambda module, directory, execution: module.process_files(directory, execution=execution), {'product_type': 'S2', 'contains': 'OPER'}),
+    'run_pipeline': (lambda module, directory, execution: module.process_files(directory, 'S', ['last_update', 'collection', 'odata_url'], execution=execution), {}),
+}
+
+
+def _prepare_last_metadata_update(mmd):
+    # log_change and set_to_inactive need the new last_metadata_update format
+    mmd.update_last_metadata_update()
+
+
+def _prepare_extents(mmd):
+    mmd.get_geospatial_extents()
+
+
+# The MMD methods to benchmark: name, setup (not timed) and the timed call on a read MMD object
+METHODS = [
+    ('get_geospatial_extents', None, lambda mmd: mmd.get_geospatial_extents()),
+    ('check_if_within_polygon', _prepare_extents, lambda mmd: mmd.check_if_within_polygon()),
+    ('check_if_within_sios', _prepare_extents, lambda mmd: mmd.check_if_within_sios()),
+    ('check_element_exists', None, lambda mmd: mmd.check_element_exists('.//mmd:collection')),
+    ('get_collections', None, lambda mmd: mmd.get_collections()),
+    ('get_odata_access_url', None, lambda mmd: mmd.get_odata_access_url()),
+    ('get_last_metadata_updates', None, lambda mmd: mmd.get_last_metadata_updates()),
+    ('remove_element', None, lambda mmd: mmd.remove_element('.//mmd:collection')),
+    ('add_collection', None, lambda mmd: mmd.add_collection('NBS')),
+    ('update_odata_access_url', None, lambda mmd: mmd.update_odata_access_url()),
+    ('update_last_metadata_update', None, lambda mmd: mmd.update_last_metadata_update()),
+    ('set_to_active', None, lambda mmd: mmd.set_to_active()),
+    ('set_to_inactive', _prepare_last_metadata_update, lambda mmd: mmd.set_to_inactive()),
+    ('log_change', _prepare_last_metadata_update, lambda mmd: mmd.log_change('Minor modification', 'Benchmark')),
+    ('apply_transform', None, lambda mmd: mmd.apply_transform(get_transform('clean_record'))),
+    ('write', None, lambda mmd: mmd.write(force=True)),
+]
+
+# Expressions timed for the per-call cost of the compiled XPath registry
+XPATH_EXPRESSIONS = [
+    './/mmd:metadata_status',
+    './/mmd:north',
+    './/mmd:data_access[mmd:type="ODATA"]',
+    './/mmd:last_metadata_update',
+]
+XPATH_REPEAT = 20
+
+# Commands timed from the start of a new interpreter to the end of --help,
+# the fixed cost of every run of a script
+STARTUP_COMMANDS = {
+    'import lib.utils': ['-c', 'import lib.utils'],
+    'check_mmd_collection.py': ['check_mmd_collection.py', '--help'],
+    'update_mmd_collection.py': ['update_mmd_collection.py', '--help'],
+    'list_products_ouside_polygon.py': ['list_products_ouside_polygon.py', '--help'],
+    'mmd_manage.py': ['mmd_manage.py', '--help'],
+    'mmd_manage.py check-collection': ['mmd_manage.py', 'check-collection', '--help'],
+}
+STARTUP_REPEAT = 10
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process and its finished children, in kB.
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children)
+
+
+def _child(queue, function, args):
+    try:
+        results = function(*args)
+        rss = peak_rss_kb()
+        for result in results:
+            result['peak_rss_kb'] = rss
+        queue.put(results)
+    except Exception:
+        queue.put(traceback.format_exc())
+
+
+def run_isolated(function, *args):
+    """
+    Run a benchmark in a fresh process, so its peak RSS is measured on its own.
+    """
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, function, args))
+    process.start()
+    results = queue.get()
+    process.join()
+    if isinstance(results, str):
+        raise RuntimeError(results)
+    return results
+
+
+def _result(name, files, seconds, stages):
+    return {
+        'name': name,
+        'files': files,
+        'seconds': seconds,
+        'files_per_sec': files / seconds if seconds else None,
+        'stages': stages,
+    }
+
+
+def benchmark_script(name, corpus, workers):
+    """
+    Time the process_files of a script on a copy of the corpus.
+    """
+    call, discovery = SCRIPTS[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'archive')
+        shutil.copytree(corpus, directory)
+        module = importlib.import_module(name)
+        if hasattr(module, 'get_log_file_path'):
+            # Keep the logs out of the repository
+            module.get_log_file_path = lambda product_type, label=None: os.path.join(tmp, f"{name}_{product_type}.txt")
+
+        start = time.perf_counter()
+        files = sum(1 for _ in find_xml_files(directory, **discovery))
+        discover = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            call(module, directory, {'workers': workers})
+        seconds = time.perf_counter() - start
+    return [_result(name, files, seconds, {'discover': discover, 'process_files': seconds})]
+
+
+def benchmark_methods(corpus):
+    """
+    Time MMD.read, the streaming reader and each MMD method over all files of a copy of the corpus.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'archive')
+        shutil.copytree(corpus, directory)
+        xml_files = list(find_xml_files(directory))
+        files = len(xml_files)
+
+        start = time.perf_counter()
+        for xml_file in xml_files:
+            MMD(xml_file).read()
+        seconds = time.perf_counter() - start
+        results.append(_result('MMD.read', files, seconds, {'read': seconds}))
+
+        for fields in (('collection',), ('rectangle',)):
+            start = time.perf_counter()
+            for xml_file in xml_files:
+                read_fields(xml_file, fields)
+            seconds = time.perf_counter() - start
+            results.append(_result(f"read_fields({','.join(fields)})", files, seconds, {'read': seconds}))
+
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for name, setup, call in METHODS:
+                seconds = 0.0
+                for xml_file in xml_files:
+                    mmd = MMD(xml_file)
+                    mmd.read()
+                    if setup is not None:
+                        setup(mmd)
+                    start = time.perf_counter()
+                    call(mmd)
+                    seconds += time.perf_counter() - start
+                results.append(_result(f"MMD.{name}", files, seconds, {name: seconds}))
+
+        # Per-call cost of the compiled, anchored XPaths against ElementPath with the document nsmap
+        compiled = elementpath = 0.0
+        calls = 0
+        for xml_file in xml_files:
+            mmd = MMD(xml_file)
+            mmd.read()
+            for expression in XPATH_EXPRESSIONS:
+                xpath = get_xpath(expression)
+                start = time.perf_counter()
+                for _ in range(XPATH_REPEAT):
+                    xpath(mmd.root)
+                compiled += time.perf_counter() - start
+                start = time.perf_counter()
+                for _ in range(XPATH_REPEAT):
+                    mmd.root.find(expression, namespaces=mmd.root.nsmap)
+                elementpath += time.perf_counter() - start
+                calls += XPATH_REPEAT
+        result = _result('xpath', files, compiled, {'compiled_xpath': compiled, 'elementpath_find': elementpath})
+        result['calls'] = calls
+        result['ns_per_call'] = {'compiled_xpath': compiled / calls * 1e9, 'elementpath_find': elementpath / calls * 1e9}
+        results.append(result)
+    return results
+
+
+def benchmark_startup():
+    """
+    Time starting the scripts, run STARTUP_REPEAT times each.
+    files and files_per_sec are the runs and runs per second.
+    """
+    results = []
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for name, arguments in STARTUP_COMMANDS.items():
+        seconds = 0.0
+        for _ in range(STARTUP_REPEAT):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + arguments, cwd=root, stdout=subprocess.DEVNULL, check=True)
+            seconds += time.perf_counter() - start
+        result = _result(f"startup {name}", STARTUP_REPEAT, seconds, {'startup': seconds})
+        result['ms_per_run'] = seconds / STARTUP_REPEAT * 1e3
+        results.append(result)
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(corpus, workers=1, only=None):
+    """
+    Run the benchmarks against the corpus directory and return the report as a dict.
+    """
+    results = []
+    for name in SCRIPTS:
+        if only is None or name in only:
+            results.extend(run_isolated(benchmark_script, name, corpus, workers))
+    if only is None or 'methods' in only:
+        results.extend(run_isolated(benchmark_methods, corpus))
+    if only is None or 'startup' in only:
+        results.extend(run_isolated(benchmark_startup))
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'commit': get_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'corpus_files': sum(1 for _ in find_xml_files(corpus)),
+        'workers': workers,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the MMD scripts and the MMD methods on a synthetic archive.')
+    parser.add_argument('--corpus', type=str, default=None, help='Use this archive instead of generating one')
+    parser.add_argument('--files', type=int, default=1000, help='Number of MMD records to generate (default: 1000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated archive (default: 0)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes for the scripts (default: 1)')
+    parser.add_argument('--only', type=str, default=None, help=f"Comma separated benchmarks to run ({', '.join(SCRIPTS)}, methods, startup)")
+    parser.add_argument('--output', type=str, default=None, help='Write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+    only = set(args.only.split(',')) if args.only else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = os.path.join(tmp, 'corpus')
+            generate_corpus(corpus, args.files, args.seed)
+        report = run_benchmarks(corpus, args.workers, only)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,80 @@
 import os
-from lib.utils import MMD, find_xml_files
-import argparse
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.index import MMDIndex, add_index_arguments
+from lib.shard import get_shard_label
 
-def process_files(directory, product_type):
+def has_collection(mmd):
     """
-    Process XML files and remove data access elements if the corresponding NC file does not exist.
+    Check whether the MMD record has a collection element, empty or not.
+    The record is parsed in full: on records of a few kB that is faster than
+    the streaming reader (lib.reader), even though it stops at the collection.
     """
-    xml_files = find_xml_files(directory, product_type)
+    mmd.read()
+    return mmd.check_element_exists(".//mmd:collection") # Returns True or False
+
+def get_log_file_path(product_type, label=None):
     script_directory = os.path.dirname(os.path.abspath(__file__))
-    log_file_path = os.path.join(script_directory, f"missing_collection_{product_type}.txt")
+    suffix = f"_{label}" if label else ''
+    return os.path.join(script_directory, f"missing_collection_{product_type}{suffix}.txt")
+
+def process_files(directory, product_type, discovery=None, execution=None, instrumentation=None):
+    """
+    Process XML files and remove data access elements if the corresponding NC file does not exist.
+    """
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+    log_file_path = get_log_file_path(product_type, get_shard_label(discovery))
 
     with open(log_file_path, 'a') as log_file:
-        for xml_file in xml_files:
-            print(xml_file)
-            mmd = MMD(xml_file)
-            mmd.read()
-            exists = mmd.check_element_exists(".//mmd:collection") # Returns True or False
-            if not exists:
-                log_file.write(f"{xml_file}\n")
+        for file_result in stats.track(process_in_parallel(xml_files, has_collection, **(execution or {}))):
+            if file_result.error:
+                print_failure(file_result)
+                continue
+            if not file_result.result:
+                stats.count('missing_collection')
+                log_file.write(f"{file_result.filepath}\n")
+    stats.finish()
+
+def process_index(index_path, directory, product_type, discovery=None, execution=None, refresh=True):
+    """
+    Answer from the SQLite index of the MMD records instead of reading every file.
+    Only new or changed files are parsed when refreshing the index.
+    """
+    with MMDIndex(index_path) as index:
+        if refresh:
+            print(index.refresh(directory, product_type, discovery, execution))
+        missing = index.missing_collection(directory, product_type)
+
+    with open(get_log_file_path(product_type), 'a') as log_file:
+        for path in missing:
+            log_file.write(f"{path}\n")
+
+DESCRIPTION = 'List the records without a collection.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser)
+    add_index_arguments(parser)
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    if args.index:
+        process_index(args.index, args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), not args.no_refresh)
+    else:
+        process_files(args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
 
 def main():
     """
     Main function to parse arguments and initiate the process.
     """
-    parser = argparse.ArgumentParser(description='Process XML files to remove data access elements if corresponding NC file is not found.')
-    parser.add_argument('directory', type=str, help='Top level directory to search')
-    parser.add_argument('product_type', type=str, help='Product type to search for (e.g., S2A, S1A)')
-
-    args = parser.parse_args()
-    process_files(args.directory, args.product_type)
+    run_script(DESCRIPTION, configure_parser, run)
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,14 @@
 import os
+from collections import OrderedDict
 from lxml import etree
-import argparse
-
-def find_xml_files(directory, product_type):
-    """
-    Find all XML files in the metadata directories for the given product type.
-    """
-    xml_files = []
-    for root, dirs, files in os.walk(directory):
-        if product_type in root and 'metadata' in dirs:
-            metadata_dir = os.path.join(root, 'metadata')
-            for file in os.listdir(metadata_dir):
-                if file.endswith(".xml"):
-                    xml_files.append(os.path.join(metadata_dir, file))
-    return xml_files
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.shard import get_shard_label
+from lib.transform import get_transform_operation
+from lib.validate import InvalidRecord, validate_tree
+from lib.writeback import write_tree
 
 def get_corresponding_nc_file(xml_file):
     """
@@ -24,14 +19,50 @@ def get_corresponding_nc_file(xml_file):
     nc_file_path = os.path.join(parent_dir, nc_file_name)
     return nc_file_path
 
-def update_xml(xml_file):
+# Number of directory listings kept while checking for NC files
+NC_LISTING_CACHE_SIZE = 256
+
+def list_nc_files(directory):
     """
-    Update xml
+    Names of the NC files in a directory, from a single directory read.
     """
-    tree = etree.parse(xml_file)
-    root = tree.getroot()
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries if entry.name.endswith('.nc'))
+    except FileNotFoundError:
+        return frozenset()
+
+def find_missing_nc_files(xml_files):
+    """
+    Yield the XML files whose corresponding NC file does not exist.
+    Instead of a stat call per file, each directory holding the NC files
+    is listed once and all XML files of that directory are checked against it.
+    Discovery yields the files directory by directory, so a small cache
+    of listings is enough.
+    """
+    listings = OrderedDict()
+    for xml_file in xml_files:
+        nc_directory, nc_file_name = os.path.split(get_corresponding_nc_file(xml_file))
+        if nc_directory in listings:
+            listings.move_to_end(nc_directory)
+        else:
+            listings[nc_directory] = list_nc_files(nc_directory)
+            if len(listings) > NC_LISTING_CACHE_SIZE:
+                listings.popitem(last=False)
+        if nc_file_name not in listings[nc_directory]:
+            yield xml_file
 
-    # Removing data access elements apart from where type is ODATA
+def get_log_file_path(product_type, label=None):
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    suffix = f"_{label}" if label else ''
+    return os.path.join(script_directory, f"missing_nc_{product_type}{suffix}.txt")
+
+def strip_data_access(root):
+    """
+    Remove the data access elements apart from where type is ODATA.
+    Returns True if anything was removed.
+    """
+    modified = False
     xml_element_list = root.findall(
         './/mmd:data_access',
         namespaces=root.nsmap
@@ -42,9 +73,15 @@ def update_xml(xml_file):
             type_elem = xml_element.find('mmd:type', namespaces=root.nsmap)
             if type_elem is None or type_elem.text != 'ODATA':
                 xml_element.getparent().remove(xml_element)
+                modified = True
+    return modified
 
-
-    # Removing link to dataset landing page on THREDDs
+def drop_landing_pages(root):
+    """
+    Remove the links to the dataset landing pages on THREDDS.
+    Returns True if anything was removed.
+    """
+    modified = False
     # Find all related_information elements
     related_info_elements = root.findall(
         './/mmd:related_information',
@@ -60,39 +97,97 @@ def update_xml(xml_file):
         if type_elem is not None and type_elem.text == 'Dataset landing page':
             parent = elem.getparent()
             parent.remove(elem)
+            modified = True
+    return modified
 
-    # Find the file_format element within storage_information and change its text to 'SAFE'
+def set_safe_file_format(root):
+    """
+    Change the file_format within storage_information to SAFE.
+    Returns True if it was changed.
+    """
     file_format_elem = root.find('.//mmd:storage_information/mmd:file_format', namespaces=root.nsmap)
-    if file_format_elem is not None:
+    if file_format_elem is not None and file_format_elem.text != 'SAFE':
         file_format_elem.text = 'SAFE'
+        return True
+    return False
 
-    tree.write(
-            xml_file,
-            pretty_print=True
-        )
+def update_xml(xml_file, schema=None):
+    """
+    Update xml
+    The file is only written if anything was changed.
+    With a schema, the updated record is validated first and InvalidRecord
+    is raised instead of writing an invalid record, as MMD.write does.
+    Returns True if the file was written.
+    """
+    tree = etree.parse(xml_file)
+    root = tree.getroot()
+    # All three, not stopping at the first change
+    modified = [strip_data_access(root), drop_landing_pages(root), set_safe_file_format(root)]
+
+    if not any(modified):
+        return False
+    if schema is not None:
+        errors = validate_tree(tree, schema)
+        if errors:
+            raise InvalidRecord(xml_file, errors)
+    write_tree(tree, xml_file)
+    return True
 
-def process_files(directory, product_type):
+def clean_record(mmd):
+    """
+    Update the XML file, for records whose corresponding NC file does not exist.
+    Returns True if the file was written.
+    """
+    return update_xml(mmd.filepath, mmd.schema)
+
+def process_files(directory, product_type, discovery=None, execution=None, instrumentation=None, xslt=False):
     """
     Process XML files and remove data access elements if the corresponding NC file does not exist.
+    With xslt, the records are updated with the compiled lib/xslt/clean_record.xsl instead of update_xml.
     """
-    xml_files = find_xml_files(directory, product_type)
-    for xml_file in xml_files:
-        #print("Processing XML file", xml_file)
-        nc_file_path = get_corresponding_nc_file(xml_file)
-        if not os.path.exists(nc_file_path):
-            print(f"Updating {xml_file}")
-            update_xml(xml_file)
+    operation = get_transform_operation('clean_record') if xslt else clean_record
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, metadata_only=True, **(discovery or {})))
+
+    with open(get_log_file_path(product_type, get_shard_label(discovery)), 'a') as log_file:
+
+        def report_missing(missing_files):
+            # Stream the files with a missing NC file to the log as they are found
+            for xml_file in missing_files:
+                log_file.write(f"{xml_file}\n")
+                yield xml_file
+
+        missing_files = report_missing(find_missing_nc_files(xml_files))
+        for file_result in stats.track(process_in_parallel(missing_files, operation, **(execution or {}))):
+            if file_result.error:
+                print_failure(file_result)
+            elif file_result.result:
+                stats.count('updated')
+            else:
+                stats.count('unchanged')
+    stats.count('checked', stats.discovered)
+    stats.finish()
+
+DESCRIPTION = 'Process XML files to remove data access elements if corresponding NC file is not found.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, resumable=True)
+    parser.add_argument('--xslt', action='store_true', help='Update the records with the compiled clean_record.xsl stylesheet')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args), args.xslt)
 
 def main():
     """
     Main function to parse arguments and initiate the process.
     """
-    parser = argparse.ArgumentParser(description='Process XML files to remove data access elements if corresponding NC file is not found.')
-    parser.add_argument('directory', type=str, help='Top level directory to search')
-    parser.add_argument('product_type', type=str, help='Product type to search for (e.g., S2A, S1A)')
-
-    args = parser.parse_args()
-    process_files(args.directory, args.product_type)
+    run_script(DESCRIPTION, configure_parser, run)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import functools
+import json
+import os
+import time
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.export import DEFAULT_BATCH_SIZE, BatchPoster, BatchWriter, export_record, parse_header, parse_since
+from lib.instrument import RunStats, get_instrumentation_options
+
+def read_state(state_path):
+    """
+    The start time of the last completed export recorded in the state file, None if there is none.
+    """
+    if state_path is None or not os.path.exists(state_path):
+        return None
+    with open(state_path) as state_file:
+        return json.load(state_file)['started']
+
+def write_state(state_path, started):
+    with open(state_path + '.tmp', 'w') as state_file:
+        json.dump({'started': started}, state_file)
+    os.replace(state_path + '.tmp', state_path)
+
+def process_files(directory, product_type, output_dir, batch_size=DEFAULT_BATCH_SIZE, changed_since=None, state=None,
+                  post_url=None, headers=None, discovery=None, execution=None, instrumentation=None):
+    """
+    Export the XML files as compressed JSON Lines batches in output_dir,
+    and post every batch to post_url if given.
+    Only files modified after changed_since (a timestamp) are exported, or,
+    with a state file, after the start of the last completed export.
+    """
+    started = time.time()
+    if changed_since is None:
+        changed_since = read_state(state)
+    stats = RunStats(**(instrumentation or {}))
+    poster = BatchPoster(post_url, headers) if post_url else None
+
+    def post(path):
+        start = time.perf_counter()
+        poster.post(path)
+        stats.record('post', time.perf_counter() - start)
+
+    writer = BatchWriter(output_dir, batch_size, on_batch=post if poster else None)
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+
+    try:
+        operation = functools.partial(export_record, changed_since)
+        for file_result in stats.track(process_in_parallel(xml_files, operation, **(execution or {}))):
+            if file_result.error:
+                print_failure(file_result)
+            elif file_result.result is None:
+                stats.count('unchanged')
+            else:
+                writer.write(file_result.result)
+                stats.count('exported')
+        writer.close()
+    finally:
+        if poster is not None:
+            poster.close()
+    stats.count('batches', writer.batches)
+    if poster is not None:
+        stats.count('posted', poster.posted)
+    summary = stats.finish()
+    if state is not None and not summary['counters'].get('failed'):
+        # The next export picks up from the start of this one
+        write_state(state, started)
+
+DESCRIPTION = 'Export the MMD records as compressed JSON Lines batches, optionally posting them to a catalog.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser)
+    parser.add_argument('--output-dir', type=str, required=True, help='Directory to write the mmd_<run start>_<number>.jsonl.gz batches to')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'Number of records per batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--changed-since', type=parse_since, default=None, help='Only export files modified after this time (YYYY-MM-DD[THH:MM:SS], UTC)')
+    parser.add_argument('--state', type=str, default=None, help='State file with the start of the last completed export, to only export what changed since')
+    parser.add_argument('--post', type=str, default=None, help='POST every batch to this http(s) URL')
+    parser.add_argument('--header', type=parse_header, action='append', default=[], help="HTTP header for the posts as 'Name: value', can be repeated")
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, args.output_dir, args.batch_size, args.changed_since, args.state,
+                  args.post, dict(args.header), get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
+
+def main():
+    """
+    Main function to parse arguments and initiate the export.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
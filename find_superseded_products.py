@@ -0,0 +1,85 @@
+import os
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.duplicates import DatatakeGroups
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+
+def set_to_inactive(mmd):
+    """
+    Read the MMD record and apply set_to_inactive, unless it is Inactive already.
+    Records with the old last_metadata_update format are converted first, as log_change needs update entries.
+    Returns True if the file was written.
+    """
+    mmd.read()
+    if mmd.get_element_text('mmd:metadata_status') == 'Inactive':
+        return False
+    mmd.update_last_metadata_update()
+    mmd.set_to_inactive()
+    return mmd.write()
+
+def get_log_file_path(product_type):
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(script_directory, f"superseded_{product_type}.txt")
+
+def process_files(directory, product_type, apply=False, discovery=None, execution=None, instrumentation=None):
+    """
+    Find the records superseded by a newer record of the same datatake, or
+    duplicating one, and log them as "<path>\t<newer path>\t<reason>".
+    The file names are used, and the Created datetime of the records of the
+    same version. With apply, the records are set to Inactive as they are
+    found, except the undecided ones.
+    """
+    discovery = discovery or {}
+    if discovery.get('shard') or discovery.get('manifest'):
+        # The records of a datatake are spread over the shards
+        raise SystemExit('Superseded records can only be found over the whole archive, not per shard')
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **discovery))
+    groups = DatatakeGroups()
+
+    with open(get_log_file_path(product_type), 'a') as log_file:
+        def superseded():
+            for record in groups.superseded(xml_files):
+                stats.count(record.reason)
+                log_file.write(f"{record.filepath}\t{record.newer}\t{record.reason}\n")
+                # Which one is newer is not known, deactivating either could drop the newer one
+                if record.reason != 'undecided':
+                    yield record.filepath
+
+        if apply:
+            for file_result in stats.track(process_in_parallel(superseded(), set_to_inactive, **(execution or {}))):
+                if file_result.error:
+                    print_failure(file_result)
+                elif file_result.result:
+                    stats.count('deactivated')
+        else:
+            for _ in superseded():
+                pass
+    stats.count('datatakes', len(groups.newest))
+    stats.count('unparsed', groups.unparsed)
+    stats.finish()
+
+DESCRIPTION = 'List (and optionally deactivate) the records superseded by a newer version of the same product, or duplicating one.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser)
+    parser.add_argument('--apply', action='store_true', help='Set the superseded and duplicate records to Inactive (not the undecided ones)')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, args.apply, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
+
+def main():
+    """
+    Main function to parse arguments and initiate the process.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+import shapely
+from shapely import wkt
+from shapely.geometry import shape
+
+# Areas of interest shipped with the scripts
+AOI_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aois')
+DEFAULT_AOIS = {
+    'nbs': os.path.join(AOI_DIRECTORY, 'nbs.geojson'),
+    'sios': os.path.join(AOI_DIRECTORY, 'sios.geojson'),
+}
+
+# Number of extents classified at a time when classifying a stream of records
+DEFAULT_BATCH_SIZE = 10000
+
+
+def load_aoi(source):
+    """
+    Load an area of interest from a GeoJSON or WKT file, or from a WKT string.
+    A GeoJSON FeatureCollection gives the union of all its features.
+    The geometry is prepared, so repeated intersection tests are fast.
+    """
+    if os.path.isfile(source):
+        with open(source) as aoi_file:
+            text = aoi_file.read()
+    else:
+        text = source
+
+    if text.lstrip().startswith('{'):
+        data = json.loads(text)
+        if data['type'] == 'FeatureCollection':
+            geometry = shapely.union_all([shape(feature['geometry']) for feature in data['features']])
+        elif data['type'] == 'Feature':
+            geometry = shape(data['geometry'])
+        else:
+            geometry = shape(data)
+    else:
+        geometry = wkt.loads(text)
+
+    shapely.prepare(geometry)
+    return geometry
+
+
+def load_default_aoi(name):
+    """
+    Load one of the areas of interest shipped in lib/aois (nbs or sios).
+    """
+    return load_aoi(DEFAULT_AOIS[name])
+
+
+def parse_aoi_argument(value):
+    """
+    Parse a NAME=PATH (or NAME=WKT) command line value into (name, geometry).
+    A value without a name is named after the file, and the names of the
+    shipped areas (nbs, sios) can be given on their own.
+    """
+    if value in DEFAULT_AOIS:
+        return value, load_default_aoi(value)
+    if '=' in value and not value.lstrip().startswith('{'):
+        name, source = value.split('=', 1)
+    else:
+        name, source = os.path.splitext(os.path.basename(value))[0], value
+    return name, load_aoi(source)
+
+
+def classify_extents(west, south, east, north, aois):
+    """
+    Check which of the extents intersect each of the areas of interest.
+    west, south, east and north are arrays (or sequences) of equal length,
+    aois is a dict of name: geometry.
+    Returns a dict of name: boolean array, True where the extent intersects the area.
+    """
+    boxes = shapely.box(
+        np.asarray(west, dtype=float),
+        np.asarray(south, dtype=float),
+        np.asarray(east, dtype=float),
+        np.asarray(north, dtype=float)
+    )
+    masks = {}
+    for name, geometry in aois.items():
+        if not shapely.is_prepared(geometry):
+            shapely.prepare(geometry)
+        masks[name] = shapely.intersects(geometry, boxes)
+    return masks
+
+
+def classify_records(records, aois, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Classify a stream of (path, west, south, east, north) records in batches.
+    Yields (path, {name: bool}) for every record.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield from _classify_batch(batch, aois)
+            batch = []
+    if batch:
+        yield from _classify_batch(batch, aois)
+
+
+def _classify_batch(batch, aois):
+    paths, west, south, east, north = zip(*batch)
+    masks = classify_extents(west, south, east, north, aois)
+    for i, path in enumerate(paths):
+        yield path, {name: bool(mask[i]) for name, mask in masks.items()}
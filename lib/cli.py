@@ -0,0 +1,33 @@
+import argparse
+
+from lib.discovery import add_discovery_arguments
+from lib.executor import add_execution_arguments
+from lib.instrument import add_instrumentation_arguments
+
+
+def add_archive_arguments(parser, product_type=True, execution=True, instrumentation=True, resumable=False):
+    """
+    Add the arguments shared by the scripts that go over the records of an
+    archive: the directory and product type, then the discovery, execution
+    and instrumentation options (the last two unless turned off). With
+    resumable, the execution options include --journal and --resume (see
+    add_execution_arguments).
+    """
+    parser.add_argument('directory', type=str, help='Top level directory to search')
+    if product_type:
+        parser.add_argument('product_type', type=str, help='Product type to search for (e.g., S2A, S1A)')
+    add_discovery_arguments(parser)
+    if execution:
+        add_execution_arguments(parser, resumable)
+    if instrumentation:
+        add_instrumentation_arguments(parser)
+
+
+def run_script(description, configure_parser, run):
+    """
+    Run a script from its command line: the parser is built with the
+    configure_parser of the script, as for its mmd_manage.py subcommand.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    configure_parser(parser)
+    run(parser.parse_args())
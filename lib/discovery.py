@@ -0,0 +1,196 @@
+import calendar
+import os
+import re
+from datetime import date, datetime
+
+from lib.products import matches_product
+from lib.shard import in_shard, parse_shard, read_manifest
+
+# Directory names that identify a mission or platform, e.g. S1, S2A, S3B
+MISSION_DIR = re.compile(r'^S\d[A-Z]?$')
+YEAR_DIR = re.compile(r'^\d{4}$')
+MONTH_OR_DAY_DIR = re.compile(r'^\d{2}$')
+
+
+def parse_date(value):
+    """
+    Parse a YYYY-MM-DD string from the command line into a date.
+    """
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def parse_levels(value):
+    """
+    Parse comma separated product levels from the command line, e.g. L1C,L2A.
+    """
+    return tuple(level.strip().upper() for level in value.split(',') if level.strip())
+
+
+def cap_end_date(discovery, end_date):
+    """
+    Discovery options with the end date no later than end_date,
+    for scripts that only apply to products up to a given date.
+    """
+    discovery = dict(discovery or {})
+    if discovery.get('end_date') is None or discovery['end_date'] > end_date:
+        discovery['end_date'] = end_date
+    return discovery
+
+
+def _mission_matches(dirname, product_type):
+    """
+    Check whether a mission directory can contain products of product_type.
+    E.g. S2 and S2A can both contain S2A products, S2B can not.
+    """
+    return dirname.startswith(product_type) or product_type.startswith(dirname)
+
+
+def _date_parts(dirname, parts):
+    """
+    Interpret a directory name as the next year/month/day path component.
+    Returns the extended date parts, or None if the name is not a date component.
+    """
+    if not parts:
+        if YEAR_DIR.match(dirname):
+            return (int(dirname),)
+    elif len(parts) < 3 and MONTH_OR_DAY_DIR.match(dirname):
+        value = int(dirname)
+        if len(parts) == 1 and 1 <= value <= 12:
+            return parts + (value,)
+        if len(parts) == 2 and 1 <= value <= calendar.monthrange(*parts)[1]:
+            return parts + (value,)
+    return None
+
+
+def _date_range(parts):
+    """
+    First and last day covered by a (year[, month[, day]]) directory.
+    """
+    year = parts[0]
+    if len(parts) == 1:
+        return date(year, 1, 1), date(year, 12, 31)
+    month = parts[1]
+    if len(parts) == 2:
+        return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+    return date(year, month, parts[2]), date(year, month, parts[2])
+
+
+def _keep_directory(dirname, date_parts, product_type, start_date, end_date):
+    """
+    Decide whether to descend into a directory.
+    Returns (keep, date_parts) where date_parts are the date components
+    of the path including this directory.
+    """
+    if product_type and MISSION_DIR.match(dirname) and not _mission_matches(dirname, product_type):
+        return False, date_parts
+    new_parts = _date_parts(dirname, date_parts)
+    if new_parts is None:
+        return True, date_parts
+    first, last = _date_range(new_parts)
+    if start_date and last < start_date:
+        return False, new_parts
+    if end_date and first > end_date:
+        return False, new_parts
+    return True, new_parts
+
+
+def find_xml_files(directory, product_type=None, start_date=None, end_date=None, contains=None, metadata_only=False,
+                   shard=None, manifest=None, levels=None):
+    """
+    Find the MMD XML files below directory.
+    Yields the filepaths as they are found, so processing can start right away.
+
+    Directories are pruned while scanning:
+    - mission directories (e.g. S1A, S2B) not matching product_type are skipped
+    - year/month/day directories outside start_date - end_date are skipped
+
+    Files are yielded if they end with .xml, start with product_type
+    (or S if no product type is given) and contain the contains substring.
+    With metadata_only, only files within directories named metadata are yielded.
+    With start_date, end_date or levels (e.g. ('L1C',)), the product names
+    are parsed (see lib.products) to leave out the products sensed outside
+    the dates or of other levels, without opening the files.
+    With a (K, N) shard, only the files of shard K out of N are yielded (see lib.shard).
+    With a manifest, the files listed in it are used instead of scanning
+    directory, filtered on their names as above.
+    """
+    if manifest is not None:
+        yield from filter_xml_files(read_manifest(manifest), product_type, start_date, end_date, contains, metadata_only, shard, levels)
+        return
+    xml_files = _scan(directory, product_type, start_date, end_date, contains, metadata_only)
+    yield from filter_xml_files(xml_files, None, start_date, end_date, None, False, shard, levels)
+
+
+def filter_xml_files(xml_files, product_type=None, start_date=None, end_date=None, contains=None, metadata_only=False,
+                     shard=None, levels=None):
+    """
+    Pass through the filepaths that find_xml_files would yield with these
+    options, judging only by their paths, e.g. for a manifest or the files
+    reported by a watcher.
+    """
+    prefix = product_type or 'S'
+    for xml_file in xml_files:
+        dirname, name = os.path.split(xml_file)
+        if not (
+            name.endswith('.xml')
+            and name.startswith(prefix)
+            and (contains is None or contains in name)
+            and (os.path.basename(dirname) == 'metadata' or not metadata_only)
+        ):
+            continue
+        if (start_date or end_date or levels) and not matches_product(xml_file, start_date, end_date, levels):
+            continue
+        if shard is not None and not in_shard(xml_file, shard):
+            continue
+        yield xml_file
+
+
+def _scan(directory, product_type, start_date, end_date, contains, metadata_only):
+    prefix = product_type or 'S'
+    stack = [(str(directory), ())]
+    while stack:
+        path, date_parts = stack.pop()
+        in_metadata = os.path.basename(path) == 'metadata'
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        keep, parts = _keep_directory(entry.name, date_parts, product_type, start_date, end_date)
+                        if keep:
+                            subdirs.append((entry.path, parts))
+                    elif (
+                        entry.name.endswith('.xml')
+                        and entry.name.startswith(prefix)
+                        and (contains is None or contains in entry.name)
+                        and (in_metadata or not metadata_only)
+                    ):
+                        yield entry.path
+        except OSError:
+            # Unreadable or vanished directory, skip it as os.walk would
+            continue
+        stack.extend(reversed(subdirs))
+
+
+def add_discovery_arguments(parser):
+    """
+    Add the command line options used to restrict which files are found.
+    """
+    parser.add_argument('--start-date', type=parse_date, default=None, help='Only process products sensed from this date (YYYY-MM-DD), by date directory and product name')
+    parser.add_argument('--end-date', type=parse_date, default=None, help='Only process products sensed up to and including this date (YYYY-MM-DD), by date directory and product name')
+    parser.add_argument('--levels', type=parse_levels, default=None, help='Only process products of these comma separated levels, from the product name (e.g. L1C,L2A)')
+    parser.add_argument('--shard', type=parse_shard, default=None, help='Only process shard K of N (e.g. 2/4), the files are assigned to shards by a hash of the product name')
+    parser.add_argument('--manifest', type=str, default=None, help='Process the files listed in this manifest (see make_manifests.py) instead of searching the directory')
+
+
+def get_discovery_options(args):
+    """
+    Keyword arguments for find_xml_files from the parsed command line.
+    """
+    return {
+        'start_date': args.start_date,
+        'end_date': args.end_date,
+        'shard': args.shard,
+        'manifest': args.manifest,
+        'levels': args.levels,
+    }
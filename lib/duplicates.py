@@ -0,0 +1,96 @@
+from collections import namedtuple
+
+from lib.products import get_datatake
+from lib.reader import read_fields
+
+# A record to deactivate: its path, the path of a newer record of the same
+# datatake and why, superseded (older version, or older Created datetime),
+# duplicate (same version) or undecided (no version, see DatatakeGroups)
+Superseded = namedtuple('Superseded', ['filepath', 'newer', 'reason'])
+
+
+def record_created(filepath):
+    """
+    The Created datetime in the last_metadata_update of the record, or the
+    datetime of the old format, None if there is none.
+    """
+    for update_datetime, update_type, _ in read_fields(filepath, ('last_metadata_update',))['last_metadata_update']:
+        if update_type in ('Created', None):
+            return update_datetime
+    return None
+
+
+def _reason(older, newer):
+    """
+    Why the record older, (version, created, path), gives way to newer.
+    """
+    if older[0] != newer[0] or (older[1] and newer[1] and older[1] != newer[1]):
+        return 'superseded'
+    return 'duplicate' if newer[0] else 'undecided'
+
+
+class DatatakeGroups:
+    """
+    Group the records by the datatake parsed from their file names (see
+    lib.products.get_datatake), in a single pass. Only the newest record of
+    every datatake seen so far is kept, with the records left undecided
+    against it, so the time is linear in the number of records and the
+    memory in the number of datatakes.
+    Records of the same version are told apart by the Created datetime in
+    the record (read only for them, with created), then by the greatest path,
+    so the result does not depend on the order of the files.
+    Products without a version in the name (S1) that the Created datetime
+    does not tell apart are undecided: the path is no sign of which is newer.
+    They are kept until a record newer than all of them is seen, which
+    supersedes each of them.
+    """
+
+    def __init__(self, created=record_created):
+        self.newest = {}
+        self.undecided = {}
+        self.unparsed = 0
+        self.created = created
+
+    def superseded(self, xml_files):
+        """
+        Yield a Superseded for every record that is not the newest of its
+        datatake, as soon as a newer record is seen.
+        The newer record given is the newest seen at that point, the newest
+        of each datatake is in newest (datatake key: (version, created, path))
+        at the end, created is None unless it was needed. The records
+        undecided against it are in undecided (datatake key: list of the same).
+        """
+        for xml_file in xml_files:
+            datatake = get_datatake(xml_file)
+            if datatake is None:
+                self.unparsed += 1
+                continue
+            candidate = (datatake.version, None, xml_file)
+            newest = self.newest.setdefault(datatake.key, candidate)
+            if newest is candidate:
+                continue
+            if candidate[0] == newest[0]:
+                if newest[1] is None:
+                    newest = (newest[0], self.created(newest[2]) or '', newest[2])
+                    self.newest[datatake.key] = newest
+                candidate = (candidate[0], self.created(candidate[2]) or '', candidate[2])
+            if candidate > newest:
+                self.newest[datatake.key] = candidate
+                older, newer = newest, candidate
+            else:
+                older, newer = candidate, newest
+            reason = _reason(older, newer)
+            yield Superseded(older[2], newer[2], reason)
+
+            undecided = self.undecided.pop(datatake.key, [])
+            if newer is candidate:
+                # The records undecided against the one replaced may be older than the new one
+                for entry in undecided[:]:
+                    entry_reason = _reason(entry, candidate)
+                    if entry_reason != 'undecided':
+                        undecided.remove(entry)
+                        yield Superseded(entry[2], candidate[2], entry_reason)
+            if reason == 'undecided':
+                undecided.append(older)
+            if undecided:
+                self.undecided[datatake.key] = undecided
@@ -0,0 +1,244 @@
+import functools
+import multiprocessing
+import statistics
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from lib.instrument import Profiler
+from lib.journal import Journal, get_outcome
+from lib.utils import MMD
+from lib.validate import get_schema_path
+from lib.writeback import DEFAULT_SYNC_EVERY, FSYNC_MODES, WriteBack, collect_writes, defer_writes, discard_writes
+
+# Number of files handed to a worker process at a time
+DEFAULT_CHUNKSIZE = 64
+
+# Upper limit of files in flight at a time in the threads mode
+DEFAULT_MAX_IN_FLIGHT = 32
+
+MODES = ('processes', 'threads')
+
+# timings holds the seconds spent per stage (read, mutate, write, geometry, total),
+# writes the (temporary, filepath) of the writes left for lib.writeback.WriteBack to put in place
+FileResult = namedtuple('FileResult', ['filepath', 'result', 'error', 'timings', 'writes'], defaults=(None, ()))
+
+
+def _apply(operation, profiler, schema, defer, filepath):
+    """
+    Run the operation on a single file and catch any error,
+    so that one broken record does not stop the whole run.
+    With a schema, records are validated before they are written.
+    With defer, the written files are left to be put in place by the main process.
+    """
+    start = time.perf_counter()
+    mmd = MMD(filepath)
+    mmd.schema = schema
+    if defer:
+        defer_writes()
+    try:
+        if profiler is None:
+            result = operation(mmd)
+        else:
+            result = profiler.run(operation, mmd)
+        error = None
+    except Exception:
+        result, error = None, traceback.format_exc()
+    writes = collect_writes() if defer else ()
+    if error:
+        discard_writes(writes)
+        writes = ()
+    timings = dict(mmd.timings)
+    timings['total'] = time.perf_counter() - start
+    # Whatever is not reading, writing or geometry is the operation itself
+    timings['mutate'] = max(timings['total'] - sum(mmd.timings.values()), 0.0)
+    return FileResult(filepath, result, error, timings, writes)
+
+
+class AdaptiveLimit:
+    """
+    Number of files to keep in flight, adjusted to the observed I/O latency.
+
+    The limit grows by one after every window of files while the median
+    read/write latency stays within tolerance times the lowest latency seen,
+    and is cut by backoff once it does not, as the storage is then queueing
+    the requests rather than serving them in parallel (additive increase,
+    multiplicative decrease). The lowest latency is allowed to creep up a
+    little per window, so a backend that is slower for a while is not taken
+    as overloaded for good.
+    """
+
+    def __init__(self, maximum=DEFAULT_MAX_IN_FLIGHT, minimum=1, initial=4, tolerance=2.0, backoff=0.75, drift=1.05):
+        self.maximum = max(maximum, minimum)
+        self.minimum = minimum
+        self.limit = min(max(initial, minimum), self.maximum)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.drift = drift
+        self.baseline = None
+        self.window = []
+
+    def observe(self, latency):
+        self.window.append(latency)
+        if len(self.window) < self.limit:
+            return
+        median = statistics.median(self.window)
+        self.window = []
+        if self.baseline is None or median < self.baseline:
+            self.baseline = median
+        if median > self.baseline * self.tolerance:
+            self.limit = max(int(self.limit * self.backoff), self.minimum)
+        else:
+            self.limit = min(self.limit + 1, self.maximum)
+        self.baseline *= self.drift
+
+
+def get_io_latency(file_result):
+    """
+    Seconds the file spent reading and writing, or in total if the operation did not time those.
+    """
+    timings = file_result.timings or {}
+    latency = timings.get('read', 0.0) + timings.get('write', 0.0)
+    return latency or timings.get('total', 0.0)
+
+
+def process_in_parallel(xml_files, operation, workers=1, chunksize=DEFAULT_CHUNKSIZE, profile=None, journal=None,
+                        mode='processes', max_in_flight=DEFAULT_MAX_IN_FLIGHT, validate=None, writeback=None):
+    """
+    Apply an operation to every file in xml_files.
+    The operation is called with an (unread) MMD object for the file and
+    must be a module level function so it can be sent to the worker processes.
+    With more than one worker the files are distributed over a process pool
+    in chunks of chunksize.
+    In the threads mode the files are processed by a thread pool instead,
+    to overlap the file reads and writes on a network filesystem, with at
+    most max_in_flight files at a time and fewer while the I/O latency
+    shows the storage is overloaded (see AdaptiveLimit). workers and
+    chunksize are not used then.
+    Yields a FileResult (filepath, result, error, timings) for every file
+    as soon as it is done, in no particular order.
+    profile is an optional lib.instrument.Profiler run on a sample of the files.
+    With validate, the path to the MMD XSD, every record written by MMD.write
+    is first validated against it in memory (see lib.validate), and invalid
+    records fail instead of being written.
+    With a lib.writeback.WriteBack, the files written are put in place by
+    this process, in batches, with fsync and a backup of the originals as
+    configured, and a result is only yielded once its file is in place.
+    With a lib.journal.Journal, files completed in an earlier run are skipped
+    and the outcome for every file is recorded.
+    """
+    if mode == 'threads':
+        process = functools.partial(_process_threads, max_in_flight=max_in_flight)
+    else:
+        process = functools.partial(_process, workers=workers, chunksize=chunksize)
+    if writeback is not None and writeback.deferred:
+        task = functools.partial(_apply, operation, profile, validate, True)
+        process = _committed(process, writeback)
+    else:
+        task = functools.partial(_apply, operation, profile, validate, False)
+
+    if journal is None:
+        yield from process(xml_files, task)
+        return
+
+    try:
+        for file_result in process(journal.skip_completed(xml_files), task):
+            yield file_result
+            # Recorded once the caller has handled the result
+            journal.record(file_result.filepath, get_outcome(file_result))
+    finally:
+        journal.close()
+        if journal.skipped:
+            print(f"Skipped {journal.skipped} files completed in an earlier run (journal {journal.path})")
+
+
+def _committed(process, writeback):
+    def committed(xml_files, task):
+        return writeback.commit(process(xml_files, task))
+    return committed
+
+
+def _process(xml_files, task, workers, chunksize):
+    if workers is None or workers <= 1:
+        for xml_file in xml_files:
+            yield task(xml_file)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        for file_result in pool.imap_unordered(task, xml_files, chunksize):
+            yield file_result
+
+
+def _process_threads(xml_files, task, max_in_flight):
+    limit = AdaptiveLimit(max_in_flight)
+    xml_files = iter(xml_files)
+    in_flight = set()
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=limit.maximum) as pool:
+        while True:
+            while not exhausted and len(in_flight) < limit.limit:
+                xml_file = next(xml_files, None)
+                if xml_file is None:
+                    exhausted = True
+                else:
+                    in_flight.add(pool.submit(task, xml_file))
+            if not in_flight:
+                return
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_result = future.result()
+                limit.observe(get_io_latency(file_result))
+                yield file_result
+
+
+def print_failure(file_result):
+    """
+    Report a file that could not be processed.
+    """
+    print(f"Failed to process {file_result.filepath}:\n{file_result.error}")
+
+
+def add_execution_arguments(parser, resumable=False):
+    """
+    Add the command line options shared by all batch scripts, and with
+    resumable the --journal and --resume options. Only for the scripts that
+    rewrite the records in place, each file on its own, where repeating a
+    file does no harm: a script that sums up the files (statistics, export,
+    grouping) would silently leave out the files of the earlier run.
+    """
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes to use (default: 1)')
+    parser.add_argument('--mode', choices=MODES, default='processes', help='Process the files with a process pool, or with a thread pool overlapping the file I/O, for network filesystems (default: processes)')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT, help=f'Upper limit of files in flight at a time in the threads mode, adjusted down to the I/O latency (default: {DEFAULT_MAX_IN_FLIGHT})')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help=f'Number of files handed to a worker at a time (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--profile-dir', type=str, default=None, help='Profile a sample of the files and write the profiles to this directory')
+    parser.add_argument('--profile-every', type=int, default=1000, help='Profile every Nth file of each worker (default: 1000)')
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile', help='Profiler to use (default: cprofile, pyinstrument must be installed)')
+    parser.add_argument('--validate', type=str, default=None, metavar='SCHEMA', help='Validate every record against this MMD XSD before writing it, invalid records are not written')
+    parser.add_argument('--fsync', choices=FSYNC_MODES, default='none', help='Flush the written records to disk for every file, or for every --sync-every files (default: none, left to the kernel)')
+    parser.add_argument('--sync-every', type=int, default=DEFAULT_SYNC_EVERY, help=f'Number of files per flush with --fsync batch (default: {DEFAULT_SYNC_EVERY})')
+    parser.add_argument('--backup-dir', type=str, default=None, help='Keep the original of every record written in a compressed archive in this directory')
+    if not resumable:
+        return
+    parser.add_argument('--journal', type=str, default=None, help='Record every completed file and its outcome in this journal file')
+    parser.add_argument('--resume', action='store_true', help='Skip the files completed according to the --journal of an earlier run')
+
+
+def get_execution_options(args):
+    """
+    Keyword arguments for process_in_parallel from the parsed command line.
+    """
+    journal = getattr(args, 'journal', None)
+    if getattr(args, 'resume', False) and not journal:
+        raise SystemExit('--resume needs the --journal of the run to resume')
+    return {
+        'workers': args.workers,
+        'chunksize': args.chunksize,
+        'mode': args.mode,
+        'max_in_flight': args.max_in_flight,
+        'profile': Profiler(args.profile_dir, args.profile_every, args.profiler) if args.profile_dir else None,
+        'journal': Journal(journal, resume=args.resume) if journal else None,
+        'validate': get_schema_path(args.validate) if args.validate else None,
+        'writeback': WriteBack(args.fsync, args.backup_dir, args.sync_every),
+    }
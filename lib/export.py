@@ -0,0 +1,158 @@
+import argparse
+import gzip
+import http.client
+import json
+import os
+import urllib.parse
+from datetime import datetime, timezone
+
+# The fields of lib.reader exported for every record
+EXPORT_FIELDS = ('metadata_identifier', 'metadata_status', 'collections', 'rectangle', 'data_access', 'last_metadata_update')
+
+# Number of records per JSON Lines file
+DEFAULT_BATCH_SIZE = 10000
+
+
+def parse_since(value):
+    """
+    Parse a YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS time from the command line (UTC unless
+    an offset is given) into a POSIX timestamp.
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def export_record(changed_since, mmd):
+    """
+    The MMD record as a line of JSON, read with the streaming reader.
+    Returns None for records whose file has not been modified after the
+    changed_since timestamp, if one is given.
+    """
+    if changed_since is not None and os.stat(mmd.filepath).st_mtime <= changed_since:
+        return None
+    fields = mmd.read_fields(EXPORT_FIELDS)
+    record = {
+        'id': fields['metadata_identifier'],
+        'path': mmd.filepath,
+        'metadata_status': fields['metadata_status'],
+        'collections': fields['collections'],
+        'extent': {bound: fields[bound] for bound in ('north', 'south', 'east', 'west')},
+        'data_access': [{'type': access_type, 'resource': resource} for access_type, resource in fields['data_access']],
+        'last_metadata_update': [
+            {'datetime': update_time, 'type': update_type, 'note': note}
+            for update_time, update_type, note in fields['last_metadata_update']
+        ],
+    }
+    return json.dumps(record, separators=(',', ':'))
+
+
+class BatchWriter:
+    """
+    Write lines to gzip compressed JSON Lines files of batch_size lines each,
+    named <prefix>_<run>_<number>.jsonl.gz, where run is the UTC start time
+    of the writer, so the batches of an earlier run in the same directory
+    are never overwritten. A file is written under a temporary name and
+    renamed once complete, so a file with the final name is always a whole
+    batch. on_batch is called with the path of every completed file.
+    """
+
+    def __init__(self, directory, batch_size=DEFAULT_BATCH_SIZE, prefix='mmd', on_batch=None):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.prefix = f"{prefix}_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}"
+        self.on_batch = on_batch
+        self.batches = 0
+        self.lines = 0
+        self._file = None
+        self._path = None
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, line):
+        if self._file is None:
+            self._path = os.path.join(self.directory, f"{self.prefix}_{self.batches:05d}.jsonl.gz")
+            if os.path.exists(self._path):
+                raise FileExistsError(f"{self._path} exists already")
+            self._file = gzip.open(self._path + '.tmp', 'wt', encoding='utf-8')
+        self._file.write(line)
+        self._file.write('\n')
+        self._count += 1
+        self.lines += 1
+        if self._count >= self.batch_size:
+            self._finish_batch()
+
+    def _finish_batch(self):
+        self._file.close()
+        os.replace(self._path + '.tmp', self._path)
+        self._file = None
+        self._count = 0
+        self.batches += 1
+        if self.on_batch is not None:
+            self.on_batch(self._path)
+
+    def close(self):
+        if self._file is not None:
+            self._finish_batch()
+
+
+class BatchPoster:
+    """
+    POST the compressed JSON Lines files to an HTTP(S) endpoint, reusing
+    one connection for all of them. A request that fails because the
+    server closed the connection is retried once on a new connection.
+    """
+
+    def __init__(self, url, headers=None, timeout=60.0):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Not an http(s) URL: {url}")
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.path = urllib.parse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+        self.headers = {
+            'Content-Type': 'application/x-ndjson',
+            'Content-Encoding': 'gzip',
+            **(headers or {}),
+        }
+        self.timeout = timeout
+        self.connection = None
+        self.posted = 0
+
+    def _request(self, body):
+        if self.connection is None:
+            self.connection = self.connection_class(self.host, timeout=self.timeout)
+        self.connection.request('POST', self.path, body=body, headers=self.headers)
+        response = self.connection.getresponse()
+        text = response.read()
+        if response.will_close:
+            self.close()
+        return response.status, text
+
+    def post(self, path):
+        with open(path, 'rb') as batch_file:
+            body = batch_file.read()
+        try:
+            status, text = self._request(body)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            self.close()
+            status, text = self._request(body)
+        if not 200 <= status < 300:
+            raise RuntimeError(f"Posting {path} failed with HTTP {status}: {text[:500].decode(errors='replace')}")
+        self.posted += 1
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def parse_header(value):
+    """
+    Parse a 'Name: value' HTTP header from the command line.
+    """
+    name, separator, text = value.partition(':')
+    if not separator or not name.strip():
+        raise argparse.ArgumentTypeError(f"Headers must be 'Name: value', not {value!r}")
+    return name.strip(), text.strip()
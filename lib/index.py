@@ -0,0 +1,294 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+
+from lib.discovery import find_xml_files
+from lib.executor import process_in_parallel, print_failure
+
+# Number of index changes written per transaction during a refresh
+COMMIT_INTERVAL = 1000
+
+# Help of the --no-refresh option of the scripts answering from the index
+REFRESH_HELP = ('Use the index as it is. By default it is refreshed first, which walks the whole directory and '
+                'stats every file (only new or changed files are parsed), a full pass over the archive for every query')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS records (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    refreshed REAL NOT NULL,
+    metadata_status TEXT,
+    collections TEXT NOT NULL,
+    odata_url TEXT,
+    north REAL,
+    south REAL,
+    east REAL,
+    west REAL
+);
+CREATE INDEX IF NOT EXISTS records_filename ON records (filename);
+CREATE TABLE IF NOT EXISTS updates (
+    path TEXT NOT NULL,
+    datetime TEXT,
+    type TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS updates_path ON updates (path);
+CREATE VIRTUAL TABLE IF NOT EXISTS extents USING rtree (id, west, east, south, north);
+CREATE TRIGGER IF NOT EXISTS records_extents_insert AFTER INSERT ON records
+    WHEN new.west <= new.east AND new.south <= new.north
+    BEGIN INSERT INTO extents VALUES (new.rowid, new.west, new.east, new.south, new.north); END;
+CREATE TRIGGER IF NOT EXISTS records_extents_delete AFTER DELETE ON records
+    BEGIN DELETE FROM extents WHERE id = old.rowid; END;
+'''
+
+# Read-only connections used by the workers, one per index file, process and thread
+_worker_connections = {}
+
+
+def _get_worker_connection(db_path):
+    # Keyed on the process and thread as well, connections must not be shared
+    # with forked workers or between the threads of the threads mode
+    key = (db_path, os.getpid(), threading.get_ident())
+    if key not in _worker_connections:
+        _worker_connections[key] = sqlite3.connect(db_path)
+    return _worker_connections[key]
+
+
+def extract_record(mmd):
+    """
+    Extract the indexed fields from an MMD record.
+    """
+    stat = os.stat(mmd.filepath)
+    mmd.read()
+    record = {
+        'path': mmd.filepath,
+        'filename': mmd.filename,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'metadata_status': mmd.get_element_text('mmd:metadata_status'),
+        'collections': ','.join(mmd.get_collections()),
+        'odata_url': mmd.get_odata_access_url(),
+        'north': None,
+        'south': None,
+        'east': None,
+        'west': None,
+        'updates': mmd.get_last_metadata_updates(),
+    }
+    if mmd.check_element_exists('.//mmd:rectangle'):
+        mmd.get_geospatial_extents()
+        record.update(north=mmd.north, south=mmd.south, east=mmd.east, west=mmd.west)
+    return record
+
+
+def index_record(db_path, mmd):
+    """
+    Extract the record if the file is new or changed since it was indexed.
+    Returns None for unchanged files, without parsing them.
+    """
+    stat = os.stat(mmd.filepath)
+    known = _get_worker_connection(db_path).execute(
+        'SELECT mtime, size FROM records WHERE path = ?',
+        (mmd.filepath,)
+    ).fetchone()
+    if known == (stat.st_mtime, stat.st_size):
+        return None
+    return extract_record(mmd)
+
+
+class MMDIndex:
+    """
+    SQLite index of the metadata in the MMD records, so questions about the
+    archive can be answered without parsing every file.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(str(db_path))
+        self.connection = sqlite3.connect(self.db_path)
+        # WAL lets the worker processes read the index while it is being updated
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # INSERT OR REPLACE only fires the delete trigger keeping the R-tree in step with this
+        self.connection.execute('PRAGMA recursive_triggers=ON')
+        has_extents = self.connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'extents'").fetchone()
+        self.connection.executescript(SCHEMA)
+        if not has_extents:
+            # Index created before the R-tree was added
+            self.connection.execute(
+                'INSERT INTO extents SELECT rowid, west, east, south, north FROM records WHERE west <= east AND south <= north'
+            )
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def store(self, record, refreshed):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO records VALUES '
+            '(:path, :filename, :mtime, :size, :refreshed, :metadata_status, :collections, :odata_url, :north, :south, :east, :west)',
+            dict(record, refreshed=refreshed)
+        )
+        self.connection.execute('DELETE FROM updates WHERE path = ?', (record['path'],))
+        self.connection.executemany(
+            'INSERT INTO updates VALUES (?, ?, ?, ?)',
+            [(record['path'],) + tuple(update) for update in record['updates']]
+        )
+
+    def refresh(self, directory, product_type=None, discovery=None, execution=None, changed=None):
+        """
+        Bring the index up to date with the files below directory.
+        Only files that are new, or whose mtime or size changed, are parsed,
+        and their paths are appended to the changed list if one is given.
+        Records of files that no longer exist are removed, unless the search
+        is restricted by discovery options (e.g. a date range).
+        Unchanged files are not written to the index: the paths seen are only
+        collected in a temporary table, for finding the removed records.
+        Returns a dict with the number of parsed, unchanged, removed and failed files.
+        """
+        discovery = {key: value for key, value in (discovery or {}).items() if value is not None}
+        # Every file has to be seen to find the removed ones, so no journal here
+        execution = {key: value for key, value in (execution or {}).items() if key != 'journal'}
+        refreshed = time.time()
+        counts = {'parsed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        # Make sure the workers see the current state of the index
+        self.connection.commit()
+
+        # Removed records can only be told from a search over all the files
+        remove = not discovery
+        if remove:
+            self.connection.execute('DROP TABLE IF EXISTS temp.seen')
+            self.connection.execute('CREATE TEMP TABLE seen (path TEXT PRIMARY KEY)')
+        unchanged = []
+
+        xml_files = find_xml_files(os.path.abspath(str(directory)), product_type, **discovery)
+        operation = functools.partial(index_record, self.db_path)
+        pending = 0
+        for file_result in process_in_parallel(xml_files, operation, **execution):
+            if file_result.error:
+                print_failure(file_result)
+                counts['failed'] += 1
+                continue
+            if file_result.result is None:
+                counts['unchanged'] += 1
+                if remove:
+                    unchanged.append((file_result.filepath,))
+                    if len(unchanged) >= COMMIT_INTERVAL:
+                        self.connection.executemany('INSERT OR IGNORE INTO temp.seen VALUES (?)', unchanged)
+                        unchanged = []
+                continue
+            self.store(file_result.result, refreshed)
+            counts['parsed'] += 1
+            if changed is not None:
+                changed.append(file_result.filepath)
+            pending += 1
+            if pending >= COMMIT_INTERVAL:
+                self.connection.commit()
+                pending = 0
+
+        if remove and not counts['failed']:
+            self.connection.executemany('INSERT OR IGNORE INTO temp.seen VALUES (?)', unchanged)
+            scope, parameters = self._scope(directory, product_type)
+            stale = f'{scope} AND refreshed < ? AND path NOT IN (SELECT path FROM temp.seen)'
+            parameters.append(refreshed)
+            self.connection.execute(f'DELETE FROM updates WHERE path IN (SELECT path FROM records WHERE {stale})', parameters)
+            counts['removed'] = self.connection.execute(f'DELETE FROM records WHERE {stale}', parameters).rowcount
+        if remove:
+            self.connection.execute('DROP TABLE temp.seen')
+        self.connection.commit()
+        return counts
+
+    def _scope(self, directory=None, product_type=None):
+        """
+        SQL condition and parameters restricting a query to a directory and product type.
+        """
+        # Compared as prefixes, not with LIKE, where _ and % in a path would be wildcards
+        conditions = ['1']
+        parameters = []
+        if directory:
+            prefix = os.path.join(os.path.abspath(str(directory)), '')
+            conditions.append('substr(path, 1, ?) = ?')
+            parameters.extend([len(prefix), prefix])
+        if product_type:
+            conditions.append('substr(filename, 1, ?) = ?')
+            parameters.extend([len(product_type), product_type])
+        return ' AND '.join(conditions), parameters
+
+    def _select(self, where, parameters, directory=None, product_type=None):
+        scope, scope_parameters = self._scope(directory, product_type)
+        query = f'SELECT path FROM records WHERE ({where}) AND {scope} ORDER BY path'
+        return [row[0] for row in self.connection.execute(query, list(parameters) + scope_parameters)]
+
+    def missing_collection(self, directory=None, product_type=None):
+        """
+        Paths of the records without any collection.
+        """
+        return self._select("collections = ''", (), directory, product_type)
+
+    def with_metadata_status(self, status, directory=None, product_type=None):
+        """
+        Paths of the records with the given metadata_status (e.g. Active).
+        """
+        return self._select('metadata_status = ?', (status,), directory, product_type)
+
+    def with_odata_host(self, host, directory=None, product_type=None):
+        """
+        Paths of the records with an ODATA access URL on the given host.
+        """
+        return self._select('instr(odata_url, ?) > 0', (f'://{host}/',), directory, product_type)
+
+    def extents(self, directory=None, product_type=None):
+        """
+        Yield (path, west, south, east, north) for all records with a bounding box.
+        """
+        scope, parameters = self._scope(directory, product_type)
+        yield from self.connection.execute(
+            f'SELECT path, west, south, east, north FROM records WHERE north IS NOT NULL AND {scope} ORDER BY path',
+            parameters
+        )
+
+    def query_aoi(self, aoi, directory=None, product_type=None, outside=False):
+        """
+        Paths of the records whose bounding box intersects the area of interest,
+        or with outside, of the records with a bounding box that does not.
+        Only the records whose box overlaps the bounds of the area, found with
+        the R-tree, are tested against the area itself. Boxes crossing the
+        antimeridian (west > east) are not in the R-tree and are always tested.
+        """
+        from lib.aoi import classify_records
+        scope, parameters = self._scope(directory, product_type)
+        min_x, min_y, max_x, max_y = aoi.bounds
+        candidates = self.connection.execute(
+            'SELECT path, west, south, east, north FROM records WHERE '
+            '(rowid IN (SELECT id FROM extents WHERE west <= ? AND east >= ? AND south <= ? AND north >= ?) '
+            f'OR west > east OR south > north) AND {scope}',
+            [max_x, min_x, max_y, min_y] + parameters
+        )
+        intersecting = {path for path, within in classify_records(candidates, {'aoi': aoi}) if within['aoi']}
+        if not outside:
+            return sorted(intersecting)
+        return [path for path in self._select('north IS NOT NULL', (), directory, product_type) if path not in intersecting]
+
+    def last_metadata_updates(self, path):
+        """
+        The last_metadata_update entries of a record as (datetime, type, note).
+        """
+        return self.connection.execute(
+            'SELECT datetime, type, note FROM updates WHERE path = ? ORDER BY rowid',
+            (path,)
+        ).fetchall()
+
+
+def add_index_arguments(parser):
+    """
+    Add the command line options for answering from the index instead of the files.
+    """
+    parser.add_argument('--index', type=str, default=None, help='Answer from this SQLite index of the MMD records, created if missing')
+    parser.add_argument('--no-refresh', action='store_true', help=REFRESH_HELP)
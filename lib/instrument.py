@@ -0,0 +1,254 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+# Seconds between progress lines
+DEFAULT_PROGRESS_INTERVAL = 10.0
+
+# Latency histogram buckets are powers of two in microseconds, up to about 18 minutes
+HISTOGRAM_BUCKETS = 31
+
+
+class Histogram:
+    """
+    Latency histogram with power of two buckets.
+    Keeps count, total, min and max exactly and gives percentiles
+    to within a factor two, in constant memory.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        microseconds = seconds * 1e6
+        index = 0 if microseconds < 1 else min(int(math.log2(microseconds)) + 1, HISTOGRAM_BUCKETS - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """
+        Upper bound of the bucket holding the given fraction (0-1) of the values, in seconds.
+        """
+        if not self.count:
+            return None
+        threshold = fraction * self.count
+        cumulative = 0
+        for index, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(2 ** index / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets_us': {f"<{2 ** index}": count for index, count in enumerate(self.buckets) if count},
+        }
+
+
+def _format_duration(seconds):
+    return str(timedelta(seconds=int(seconds)))
+
+
+class RunStats:
+    """
+    Counters and per-stage latency histograms for a batch run.
+
+    Wrap the file source with track_discovery and the results of
+    process_in_parallel with track. Progress lines with files/sec and an
+    ETA are printed every interval seconds, and finish prints a summary
+    and writes it as JSON to the report file.
+    """
+
+    def __init__(self, report=None, interval=DEFAULT_PROGRESS_INTERVAL, expected_files=None, stream=None):
+        self.report = report
+        self.interval = interval
+        self.expected_files = expected_files
+        self.stream = stream or sys.stdout
+        self.counters = Counter()
+        self.stages = {}
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.last_progress = self.start
+        self.discovered = 0
+        self.discovery_done = False
+
+    def record(self, stage, seconds):
+        if stage not in self.stages:
+            self.stages[stage] = Histogram()
+        self.stages[stage].add(seconds)
+
+    def count(self, name, increment=1):
+        self.counters[name] += increment
+
+    def track_discovery(self, xml_files):
+        """
+        Pass the files through, timing how long it takes to find each one.
+        """
+        iterator = iter(xml_files)
+        while True:
+            start = time.perf_counter()
+            try:
+                xml_file = next(iterator)
+            except StopIteration:
+                self.discovery_done = True
+                return
+            self.record('discover', time.perf_counter() - start)
+            self.discovered += 1
+            yield xml_file
+
+    def track(self, file_results):
+        """
+        Pass the results through, recording their stage timings and errors.
+        """
+        for file_result in file_results:
+            self.count('files')
+            if file_result.error:
+                self.count('failed')
+            for stage, seconds in (file_result.timings or {}).items():
+                self.record(stage, seconds)
+            self.progress()
+            yield file_result
+
+    def progress(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last_progress < self.interval:
+            return
+        self.last_progress = now
+        done = self.counters['files']
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed else 0.0
+        line = f"[progress] {done} files ({self.counters['failed']} failed) in {_format_duration(elapsed)}, {rate:.1f} files/s"
+        if self.expected_files:
+            if rate:
+                line += f", ETA {_format_duration(max(self.expected_files - done, 0) / rate)} for {self.expected_files} files"
+        elif rate:
+            # Without a known total, estimate from the files found so far
+            remaining = _format_duration(max(self.discovered - done, 0) / rate)
+            line += f", ETA {remaining} for {self.discovered} files found" + ('' if self.discovery_done else ' so far')
+        print(line, file=self.stream, flush=True)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        return {
+            'started': datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+            'finished': datetime.now(timezone.utc).isoformat(),
+            'elapsed': elapsed,
+            'files': self.counters['files'],
+            'files_per_sec': self.counters['files'] / elapsed if elapsed else None,
+            'counters': dict(self.counters),
+            'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+        }
+
+    def finish(self):
+        """
+        Print the end of run summary and write the JSON report.
+        Returns the summary.
+        """
+        summary = self.summary()
+        counters = ', '.join(f"{name}: {value}" for name, value in sorted(summary['counters'].items()))
+        print(f"Processed {summary['files']} files in {_format_duration(summary['elapsed'])} ({summary['files_per_sec'] or 0:.1f} files/s). {counters}", file=self.stream)
+        for stage, histogram in summary['stages'].items():
+            print(f"  {stage:10} total {histogram['total']:.2f}s, mean {histogram['mean'] * 1e3:.2f}ms, p95 <{histogram['p95'] * 1e3:.2f}ms", file=self.stream)
+        if self.report:
+            with open(self.report, 'w') as report_file:
+                json.dump(summary, report_file, indent=2)
+        return summary
+
+
+def add_instrumentation_arguments(parser):
+    """
+    Add the command line options for progress reporting and the run report.
+    """
+    parser.add_argument('--report', type=str, default=None, help='Write the end of run summary as JSON to this file')
+    parser.add_argument('--progress-interval', type=float, default=DEFAULT_PROGRESS_INTERVAL, help=f'Seconds between progress lines (default: {DEFAULT_PROGRESS_INTERVAL:g})')
+    parser.add_argument('--expected-files', type=int, default=None, help='Number of files expected, for the ETA')
+
+
+def get_instrumentation_options(args):
+    """
+    Keyword arguments for RunStats from the parsed command line.
+    """
+    return {
+        'report': args.report,
+        'interval': args.progress_interval,
+        'expected_files': args.expected_files,
+    }
+
+
+# Profiling state of the current process, see Profiler
+_profile_state = {'pid': None, 'calls': 0, 'profile': None}
+
+# Only one sampled call is profiled at a time, in the threads mode of lib.executor
+_profile_lock = threading.Lock()
+
+
+class Profiler:
+    """
+    Profile the operation on a sample of the files, every Nth file a worker
+    processes. Each worker process accumulates its own profile in the
+    output directory, as profile_<pid>.prof (cProfile, for pstats/snakeviz)
+    or profile_<pid>.txt (pyinstrument).
+    The state is kept per process, as the profiler is sent to the workers
+    with every chunk of files.
+    """
+
+    def __init__(self, directory, every=1000, profiler='cprofile'):
+        self.directory = directory
+        self.every = every
+        self.profiler = profiler
+
+    def _get_state(self):
+        if _profile_state['pid'] != os.getpid():
+            _profile_state.update(pid=os.getpid(), calls=0, profile=None)
+            if self.profiler == 'cprofile':
+                import cProfile
+                _profile_state['profile'] = cProfile.Profile()
+        return _profile_state
+
+    def run(self, function, *args):
+        state = self._get_state()
+        state['calls'] += 1
+        if (state['calls'] - 1) % self.every:
+            return function(*args)
+        with _profile_lock:
+            return self._run_sampled(state, function, *args)
+
+    def _run_sampled(self, state, function, *args):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.profiler == 'cprofile':
+            profile = state['profile']
+            profile.enable()
+            try:
+                return function(*args)
+            finally:
+                profile.disable()
+                profile.dump_stats(os.path.join(self.directory, f"profile_{state['pid']}.prof"))
+        from pyinstrument import Profiler as PyinstrumentProfiler
+        sampler = PyinstrumentProfiler()
+        sampler.start()
+        try:
+            return function(*args)
+        finally:
+            sampler.stop()
+            with open(os.path.join(self.directory, f"profile_{state['pid']}.txt"), 'a') as profile_file:
+                profile_file.write(sampler.output_text())
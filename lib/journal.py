@@ -0,0 +1,89 @@
+import os
+
+# Number of recorded files between fsyncs of the journal
+DEFAULT_SYNC_EVERY = 1000
+
+
+class Journal:
+    """
+    Append-only journal of the files completed in a run, one
+    "<outcome>\\t<filepath>" line per file.
+    Lines are flushed and fsynced in batches, so after a crash at most
+    the last batch is lost and those files are simply processed again.
+    """
+
+    def __init__(self, path, resume=False, sync_every=DEFAULT_SYNC_EVERY):
+        self.path = str(path)
+        self.sync_every = sync_every
+        self.pending = 0
+        self.skipped = 0
+        self._file = None
+        self.completed = self.read_completed() if resume else set()
+
+    def read_completed(self):
+        """
+        The files recorded in the journal with any outcome but failed.
+        A partly written last line is ignored.
+        """
+        completed = set()
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path) as journal_file:
+            for line in journal_file:
+                if not line.endswith('\n'):
+                    break
+                outcome, _, filepath = line[:-1].partition('\t')
+                if outcome == 'failed':
+                    completed.discard(filepath)
+                else:
+                    completed.add(filepath)
+        return completed
+
+    def skip_completed(self, xml_files):
+        """
+        Pass the files through, leaving out those completed in an earlier run.
+        """
+        for xml_file in xml_files:
+            if xml_file in self.completed:
+                self.skipped += 1
+            else:
+                yield xml_file
+
+    def _open(self):
+        self._file = open(self.path, 'a')
+        if self._file.tell() > 0:
+            with open(self.path, 'rb') as journal_file:
+                journal_file.seek(-1, os.SEEK_END)
+                if journal_file.read(1) != b'\n':
+                    # Terminate a line left partly written by a crash
+                    self._file.write('\n')
+
+    def record(self, filepath, outcome):
+        if self._file is None:
+            self._open()
+        self._file.write(f"{outcome}\t{filepath}\n")
+        self.pending += 1
+        if self.pending >= self.sync_every:
+            self.sync()
+
+    def sync(self):
+        if self._file is not None and self.pending:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pending = 0
+
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def get_outcome(file_result):
+    """
+    The outcome recorded in the journal for a FileResult:
+    failed, or the result of the operation (e.g. True if the file was written).
+    """
+    if file_result.error:
+        return 'failed'
+    return repr(file_result.result).replace('\t', ' ').replace('\n', ' ')
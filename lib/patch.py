@@ -0,0 +1,224 @@
+import functools
+import re
+import time
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+from lib.utils import get_current_time
+from lib.validate import InvalidRecord, validate_tree
+from lib.writeback import write_file
+
+MMD_NAMESPACE_URI = b'http://www.met.no/schema/mmd'
+
+
+class PatchError(Exception):
+    """
+    The file is not laid out as the byte level patches expect,
+    it has to go through the full MMD path.
+    """
+
+
+class PatchMismatch(Exception):
+    """
+    The patched file is not equivalent to the result of the full MMD path.
+    """
+
+
+def _check_document(data):
+    # Only plain documents with the MMD namespace bound once to the mmd prefix
+    if data.count(MMD_NAMESPACE_URI) != 1 or b'xmlns:mmd=' not in data:
+        raise PatchError('MMD namespace not bound to the mmd prefix')
+    if b'<!--' in data or b'<![CDATA[' in data:
+        raise PatchError('Comments or CDATA sections')
+
+
+def _find_text(data, tag, start=0, end=None):
+    """
+    The byte span of the text of the only <mmd:tag> element between start and end.
+    """
+    end = len(data) if end is None else end
+    opening = re.compile(rb'<mmd:' + tag + rb'[\s/>]')
+    if len(opening.findall(data, start, end)) != 1:
+        raise PatchError(f"Not exactly one {tag.decode()} element")
+    match = re.compile(rb'<mmd:' + tag + rb'>([^<&]*)</mmd:' + tag + rb'>').search(data, start, end)
+    if match is None:
+        raise PatchError(f"{tag.decode()} element with attributes, children or entities")
+    return match.span(1)
+
+
+def _replace(data, span, value):
+    return data[:span[0]] + value + data[span[1]:]
+
+
+def _set_status(data, value):
+    """
+    As MMD.update_element('.//mmd:metadata_status', value).
+    """
+    span = _find_text(data, b'metadata_status')
+    if data[span[0]:span[1]] == value.encode():
+        return data
+    return _replace(data, span, value.encode())
+
+
+def _within_polygon(data, mmd):
+    """
+    As MMD.get_geospatial_extents and MMD.check_if_within_polygon, on the raw bytes.
+    """
+    for bound in ('north', 'south', 'west', 'east'):
+        start, end = _find_text(data, bound.encode())
+        setattr(mmd, bound, float(data[start:end]))
+    return mmd.check_if_within_polygon()
+
+
+def _log_change(data, updatetype, note, now):
+    """
+    As MMD.log_change, appending an update entry with the same layout.
+    Only for a last_metadata_update that already holds update entries.
+    """
+    opening = re.compile(rb'<mmd:last_metadata_update[\s/>]')
+    if len(opening.findall(data)) != 1 or data.count(b'</mmd:last_metadata_update>') != 1:
+        raise PatchError('Not exactly one last_metadata_update element')
+    closing = data.index(b'</mmd:last_metadata_update>')
+    last_update = data.rfind(b'</mmd:update>', 0, closing)
+    if last_update < data.index(b'<mmd:last_metadata_update'):
+        # The old format with the datetime as text, MMD.log_change does not handle it either
+        raise PatchError('last_metadata_update without update entries')
+    last_update += len(b'</mmd:update>')
+    if data[last_update:closing].strip():
+        raise PatchError('Unexpected content after the last update entry')
+    entry = (
+        '\n    <mmd:update>'
+        f'\n      <mmd:datetime>{escape(now)}</mmd:datetime>'
+        f'\n      <mmd:type>{escape(updatetype)}</mmd:type>'
+        f'\n      <mmd:note>{escape(note)}</mmd:note>'
+        '\n    </mmd:update>\n  '
+    )
+    return data[:last_update] + entry.encode() + data[closing:]
+
+
+def set_to_active(data, mmd, now):
+    """
+    As MMD.set_to_active.
+    """
+    return _set_status(data, 'Active' if _within_polygon(data, mmd) else 'Inactive')
+
+
+def set_to_inactive(data, mmd, now):
+    """
+    As MMD.set_to_inactive.
+    """
+    span = _find_text(data, b'metadata_status')
+    if data[span[0]:span[1]].strip() == b'Inactive':
+        return data
+    data = _set_status(data, 'Inactive')
+    return _log_change(data, 'Major modification', 'Product has been deleted', now)
+
+
+def update_odata_access_url(data, mmd, now):
+    """
+    As MMD.update_odata_access_url.
+    """
+    if not _within_polygon(data, mmd):
+        return _set_status(data, 'Inactive')
+    blocks = list(re.finditer(rb'<mmd:data_access>(.*?)</mmd:data_access>', data, re.DOTALL))
+    if len(re.findall(rb'<mmd:data_access[\s/>]', data)) != len(blocks):
+        raise PatchError('data_access element with attributes')
+    for block in blocks:
+        if re.search(rb'<mmd:type>ODATA</mmd:type>', data[block.start(1):block.end(1)]):
+            span = _find_text(data, b'resource', block.start(1), block.end(1))
+            url = data[span[0]:span[1]]
+            updated_url = url.replace(b'colhub.met.no', b'colhub-archive.met.no')
+            if url == updated_url:
+                print("No update needed for the resource URL.")
+                return data
+            print(f"Updated resource URL: {updated_url.decode()}")
+            return _replace(data, span, updated_url)
+    return data
+
+
+# The byte level patches, by the name of the MMD method they stand in for
+PATCHES = {
+    'set_to_active': set_to_active,
+    'set_to_inactive': set_to_inactive,
+    'update_odata_access_url': update_odata_access_url,
+}
+
+
+def _canonical(root):
+    return etree.tostring(root, method='c14n')
+
+
+def _verify(name, mmd, data, patched, now):
+    """
+    Check the patched bytes against the full MMD path applied to the original bytes.
+    """
+    start = time.perf_counter()
+    root = etree.fromstring(data)
+    mmd.tree = root.getroottree()
+    mmd.root = root
+    mmd.ns = root.nsmap
+    mmd.modified = False
+    getattr(mmd, name)()
+    if name == 'set_to_inactive' and mmd.modified:
+        # The entry added by log_change has its own time
+        mmd.findall('mmd:last_metadata_update/mmd:update')[-1].find('mmd:datetime', namespaces=mmd.ns).text = now
+    if mmd.modified != (patched != data) or _canonical(mmd.root) != _canonical(etree.fromstring(patched)):
+        raise PatchMismatch(f"Patched {mmd.filepath} differs from the result of MMD.{name}")
+    mmd._add_time('verify', start)
+
+
+def patch_record(name, verify, mmd):
+    """
+    Apply the MMD method name to the record by patching the bytes of the
+    changed values in place, without parsing and re-serializing the document.
+    Files the patch can not handle go through the full MMD path instead
+    (counted as the fallback stage). With verify, the patched result is
+    checked to be equivalent to that of the full MMD path, before writing.
+    Returns True if the file was written.
+    """
+    start = time.perf_counter()
+    with open(mmd.filepath, 'rb') as xml_file:
+        data = xml_file.read()
+    mmd._add_time('read', start)
+
+    now = get_current_time()
+    try:
+        _check_document(data)
+        patched = PATCHES[name](data, mmd, now)
+    except PatchError:
+        # Only counted, the time goes to the read and write stages as usual
+        mmd.timings['fallback'] = 0.0
+        mmd.read()
+        getattr(mmd, name)()
+        return mmd.write()
+
+    if verify:
+        _verify(name, mmd, data, patched, now)
+    if patched == data:
+        return False
+    if mmd.schema is not None:
+        start = time.perf_counter()
+        errors = validate_tree(etree.fromstring(patched).getroottree(), mmd.schema)
+        mmd._add_time('validate', start)
+        if errors:
+            raise InvalidRecord(mmd.filepath, errors)
+    start = time.perf_counter()
+    write_file(mmd.filepath, patched)
+    mmd._add_time('write', start)
+    return True
+
+
+def get_patch_operation(name, verify=False):
+    """
+    The per-file operation applying the byte level patch for an MMD method, for use with process_in_parallel.
+    """
+    return functools.partial(patch_record, name, verify)
+
+
+def add_patch_arguments(parser):
+    """
+    Add the command line options for the byte level patches.
+    """
+    parser.add_argument('--patch', action='store_true', help='Patch the changed values in place instead of parsing and rewriting the whole file')
+    parser.add_argument('--verify-patch', action='store_true', help='Patch in place, checking every file against the full parse and rewrite first')
@@ -0,0 +1,60 @@
+import argparse
+import functools
+
+from lib.utils import MMD
+
+
+def assign_collections(mmd):
+    """
+    Set the collections of the MMD record to NBS, and SIOS if within the SIOS region.
+    The collections are only rewritten if they differ.
+    """
+    mmd.get_geospatial_extents()
+    within_sios = mmd.check_if_within_sios()
+    collections = ['NBS', 'SIOS'] if within_sios else ['NBS']
+    if sorted(mmd.get_collections()) != sorted(collections):
+        mmd.remove_element('.//mmd:collection')
+        for collection in collections:
+            mmd.add_collection(collection)
+
+
+# Maintenance steps that can be combined in one pass, each is called with a read MMD object
+STEPS = {
+    'collection': assign_collections,
+    'odata_url': MMD.update_odata_access_url,
+    'last_update': MMD.update_last_metadata_update,
+    'set_active': MMD.set_to_active,
+    'set_inactive': MMD.set_to_inactive,
+}
+
+
+def parse_steps(value):
+    """
+    Parse a comma separated list of step names from the command line.
+    """
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in STEPS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown steps {', '.join(unknown)}, choose from {', '.join(STEPS)}")
+    if not names:
+        raise argparse.ArgumentTypeError('No steps given')
+    return names
+
+
+def apply_steps(step_names, mmd):
+    """
+    Read the MMD record once, apply the steps in the given order
+    and write it once if any of them changed it.
+    Returns True if the file was written.
+    """
+    mmd.read()
+    for name in step_names:
+        STEPS[name](mmd)
+    return mmd.write()
+
+
+def get_pipeline(step_names):
+    """
+    The per-file operation applying the steps, for use with process_in_parallel.
+    """
+    return functools.partial(apply_steps, tuple(step_names))
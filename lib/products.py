@@ -0,0 +1,125 @@
+import os
+import re
+from collections import namedtuple
+from datetime import date
+
+# Parts of a Sentinel product name, e.g. mission S2A, level L1C, the sensing
+# (start) date and the processing baseline (e.g. 05.00, None if not in the name)
+Product = namedtuple('Product', ['mission', 'level', 'sensing_date', 'baseline'])
+
+# S1A_IW_GRDH_1SDV_20190811T154021_20190811T154046_007344_6F1612_5AB8
+S1_NAME = re.compile(r'^(S1[A-D])_[A-Z0-9]{2}_[A-Z_]{3}[FHM_]_(\d)[SA][SDHV]{2}_(\d{8})T\d{6}_')
+# S2A_MSIL1C_20190816T004127_N0500_R081_T36ULH_20190816T154127
+S2_NAME = re.compile(r'^(S2[A-D])_MSI(L\d[A-C])_(\d{8})T\d{6}_N(\d{2})(\d{2})_')
+# S2A_OPER_PRD_MSIL1C_PDMC_20150828T092228_R001_V20150827T062228_20150827T062228
+S2_OPER_NAME = re.compile(r'^(S2[A-D])_OPER_[A-Z]{3}_MSI(L\d[A-C])_[A-Z0-9_]{4}_\d{8}T\d{6}_R\d{3}_V(\d{8})T\d{6}_')
+# S3A_OL_1_EFR____20200101T101010_20200101T101310_20200102T120000_0180_053_065_1800_MAR_O_NT_002
+S3_NAME = re.compile(r'^(S3[A-D_])_[A-Z]{2}_(\d)_[A-Z0-9_]{6}_(\d{8})T\d{6}_.*?(?:_(\d{3}))?$')
+
+# The datatake a product belongs to (key) and its version among the products of
+# the datatake (version, compared as a tuple, the newest is the greatest)
+Datatake = namedtuple('Datatake', ['key', 'version'])
+
+# All the fields of the names, for the datatake keys
+S1_FIELDS = re.compile(r'^(S1[A-D])_([A-Z0-9]{2})_([A-Z_]{3}[FHM_])_(\d[SA][SDHV]{2})_(\d{8}T\d{6})_(\d{8}T\d{6})_(\d{6})_([0-9A-F]{6})_[0-9A-F]{4}$')
+S2_FIELDS = re.compile(r'^(S2[A-D])_(MSIL\d[A-C])_(\d{8}T\d{6})_N(\d{4})_(R\d{3})_(T[0-9A-Z]{5})_(\d{8}T\d{6})$')
+S2_OPER_FIELDS = re.compile(r'^(S2[A-D])_OPER_[A-Z]{3}_(MSIL\d[A-C])_[A-Z0-9_]{4}_(\d{8}T\d{6})_(R\d{3})_V(\d{8}T\d{6})_(\d{8}T\d{6})$')
+S3_FIELDS = re.compile(r'^(S3[A-D_])_([A-Z]{2}_\d_[A-Z0-9_]{6})_(\d{8}T\d{6})_(\d{8}T\d{6})_(\d{8}T\d{6})_[0-9_]{4}_[0-9_]{3}_([0-9_]{3})_([0-9_]{4})_[A-Z_]{3}_[A-Z]_([A-Z]{2})_([0-9_]{3})$')
+
+# Sentinel-3 timeliness, from near real time to non time critical (the final version)
+S3_TIMELINESS = {'NR': 0, 'ST': 1, 'NT': 2}
+
+
+def _date(value):
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def _strip_name(name):
+    name = os.path.basename(name)
+    for suffix in ('.xml', '.nc', '.SAFE', '.SEN3', '.zip'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def parse_product_name(name):
+    """
+    Parse a Sentinel-1, -2 or -3 product name (or the path of its MMD file)
+    into a Product. Returns None if the name does not follow any of the
+    naming conventions, or does not hold a valid date.
+    Only the name is used, the file is not opened.
+    """
+    name = _strip_name(name)
+    try:
+        match = S2_NAME.match(name)
+        if match:
+            mission, level, sensing, major, minor = match.groups()
+            return Product(mission, level, _date(sensing), f"{major}.{minor}")
+        match = S2_OPER_NAME.match(name)
+        if match:
+            mission, level, sensing = match.groups()
+            return Product(mission, level, _date(sensing), None)
+        match = S1_NAME.match(name)
+        if match:
+            mission, level, sensing = match.groups()
+            return Product(mission, f"L{level}", _date(sensing), None)
+        match = S3_NAME.match(name)
+        if match:
+            mission, level, sensing, baseline = match.groups()
+            return Product(mission, f"L{level}", _date(sensing), baseline)
+    except ValueError:
+        # E.g. month 13, not a real product name
+        return None
+    return None
+
+
+def matches_product(name, start_date=None, end_date=None, levels=None):
+    """
+    Check whether a product name is within start_date - end_date (by sensing date)
+    and has one of the levels.
+    Names that can not be parsed only match if no levels are asked for,
+    as their date is unknown but their level can not be confirmed.
+    """
+    product = parse_product_name(name)
+    if product is None:
+        return not levels
+    if levels and product.level not in levels:
+        return False
+    if start_date and product.sensing_date < start_date:
+        return False
+    if end_date and product.sensing_date > end_date:
+        return False
+    return True
+
+
+def get_datatake(name):
+    """
+    The Datatake of a Sentinel-1, -2 or -3 product name (or the path of its MMD file),
+    None if the name does not follow any of the naming conventions.
+    The products of a datatake differ only in:
+    - S1: the product unique identifier, there is no version (all are duplicates)
+    - S2: the processing baseline and the generation time
+    - S2 OPER: the creation time
+    - S3: the timeliness, the baseline and the creation time
+    A name with an impossible date (e.g. month 13) is not a product, as for
+    parse_product_name.
+    """
+    name = _strip_name(name)
+    if parse_product_name(name) is None:
+        return None
+    match = S2_FIELDS.match(name)
+    if match:
+        mission, product, sensing, baseline, orbit, tile, generated = match.groups()
+        return Datatake((mission, product, sensing, orbit, tile), (baseline, generated))
+    match = S2_OPER_FIELDS.match(name)
+    if match:
+        mission, product, created, orbit, start, stop = match.groups()
+        return Datatake((mission, 'OPER', product, orbit, start, stop), (created,))
+    match = S1_FIELDS.match(name)
+    if match:
+        return Datatake(match.groups(), ())
+    match = S3_FIELDS.match(name)
+    if match:
+        mission, product, start, stop, created, orbit, frame, timeliness, baseline = match.groups()
+        return Datatake((mission, product, start, stop, orbit, frame), (S3_TIMELINESS.get(timeliness, -1), baseline, created))
+    return None
@@ -0,0 +1,127 @@
+from lxml import etree
+
+MMD_NAMESPACE = '{http://www.met.no/schema/mmd}'
+
+# Fields that can only be complete at the end of the file
+ALL_OCCURRENCES = ('collections', 'data_access')
+
+# The elements each field is extracted from
+FIELD_TAGS = {
+    'metadata_identifier': ('metadata_identifier',),
+    'metadata_status': ('metadata_status',),
+    'collection': ('collection',),
+    'collections': ('collection',),
+    'rectangle': ('north', 'south', 'east', 'west'),
+    'odata_url': ('data_access',),
+    'data_access': ('data_access',),
+    'last_metadata_update': ('last_metadata_update',),
+}
+
+RECTANGLE_BOUNDS = ('north', 'south', 'east', 'west')
+
+
+def _text(element):
+    return element.text.strip() if element.text else None
+
+
+def _new_record(fields):
+    record = {}
+    for field in fields:
+        if field == 'rectangle':
+            record.update({bound: None for bound in RECTANGLE_BOUNDS})
+        elif field in ('collections', 'data_access', 'last_metadata_update'):
+            record[field] = []
+        else:
+            record[field] = None
+    return record
+
+
+def _last_metadata_updates(element):
+    """
+    The entries of a last_metadata_update element as (datetime, type, note),
+    like MMD.get_last_metadata_updates.
+    """
+    updates = [
+        (
+            update.findtext(MMD_NAMESPACE + 'datetime'),
+            update.findtext(MMD_NAMESPACE + 'type'),
+            update.findtext(MMD_NAMESPACE + 'note'),
+        )
+        for update in element.iterfind(MMD_NAMESPACE + 'update')
+    ]
+    if not updates and _text(element):
+        updates.append((_text(element), None, None))
+    return updates
+
+
+def read_fields(filepath, fields=('collection',)):
+    """
+    Read only the given fields from an MMD file, without building the full tree.
+
+    The file is parsed as a stream and parsing stops as soon as all the
+    fields are found. Elements are cleared once handled to keep memory low.
+    This only pays off on large records: on records of a few kB, a full
+    parse with MMD.read and the compiled XPath is faster.
+    The fields are:
+    - metadata_identifier, metadata_status: the element text
+    - collection: the first collection, enough to check that there is one
+    - collections: all collections, this needs the whole file to be read
+    - rectangle: the north, south, east and west bounds as floats
+    - odata_url: the resource of the data_access element of type ODATA
+    - data_access: all data_access elements as (type, resource), this needs the whole file to be read
+    - last_metadata_update: the entries as (datetime, type, note)
+
+    Returns a dict with the fields (and the four bounds for rectangle),
+    None or empty for fields not found in the file.
+    """
+    unknown = set(fields) - set(FIELD_TAGS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    record = _new_record(fields)
+    pending = set(fields) - set(ALL_OCCURRENCES)
+    tags = sorted({MMD_NAMESPACE + tag for field in fields for tag in FIELD_TAGS[field]})
+
+    context = etree.iterparse(filepath, events=('end',), tag=tags)
+    for event, element in context:
+        name = element.tag[len(MMD_NAMESPACE):]
+
+        if name in RECTANGLE_BOUNDS:
+            if record[name] is None:
+                record[name] = float(element.text)
+            if all(record[bound] is not None for bound in RECTANGLE_BOUNDS):
+                pending.discard('rectangle')
+        elif name == 'collection':
+            if 'collections' in record and _text(element):
+                record['collections'].append(_text(element))
+            if 'collection' in pending and _text(element):
+                record['collection'] = _text(element)
+                pending.discard('collection')
+        elif name == 'data_access':
+            if 'data_access' in record:
+                record['data_access'].append((
+                    element.findtext(MMD_NAMESPACE + 'type'),
+                    element.findtext(MMD_NAMESPACE + 'resource'),
+                ))
+            if element.findtext(MMD_NAMESPACE + 'type') == 'ODATA' and 'odata_url' in pending:
+                resource = element.find(MMD_NAMESPACE + 'resource')
+                record['odata_url'] = _text(resource) if resource is not None else None
+                pending.discard('odata_url')
+        elif name == 'last_metadata_update':
+            if 'last_metadata_update' in pending:
+                record['last_metadata_update'] = _last_metadata_updates(element)
+                pending.discard('last_metadata_update')
+        elif name in pending:
+            record[name] = _text(element)
+            pending.discard(name)
+
+        if not pending and not any(field in record for field in ALL_OCCURRENCES):
+            break
+
+        # Free the handled element and everything parsed before it
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+    del context
+
+    return record
@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import zlib
+
+from lib.instrument import HISTOGRAM_BUCKETS, Histogram
+
+
+def parse_shard(value):
+    """
+    Parse a K/N shard from the command line, e.g. 2/4 for the second of four shards.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must be K/N, e.g. 1/4, not {value!r}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard {value!r} must be between 1/{count} and {count}/{count}")
+    return index, count
+
+
+def get_product_name(filepath):
+    return os.path.basename(filepath)[:-len('.xml')] if filepath.endswith('.xml') else os.path.basename(filepath)
+
+
+def get_shard(filepath, count):
+    """
+    The shard (1 to count) of a file, from a hash of the product name.
+    The hash is stable across runs and hosts, unlike hash(), and does not
+    depend on where the archive is mounted.
+    """
+    return zlib.crc32(get_product_name(filepath).encode()) % count + 1
+
+
+def in_shard(filepath, shard):
+    index, count = shard
+    return get_shard(filepath, count) == index
+
+
+def get_shard_label(discovery=None):
+    """
+    Label for the logs of a run restricted by the shard or manifest discovery
+    options, e.g. shard_2_of_4, so that the runs of different shards do not
+    write to the same files. None for an unsharded run.
+    """
+    shard = (discovery or {}).get('shard')
+    manifest = (discovery or {}).get('manifest')
+    if shard is not None:
+        return f"shard_{shard[0]}_of_{shard[1]}"
+    if manifest is not None:
+        return os.path.splitext(os.path.basename(manifest))[0]
+    return None
+
+
+def read_manifest(path):
+    """
+    Yield the filepaths listed in a manifest, one per line.
+    """
+    with open(path) as manifest_file:
+        for line in manifest_file:
+            line = line.rstrip('\n')
+            if line:
+                yield line
+
+
+def write_manifests(xml_files, directory, count):
+    """
+    Split the files over count manifests in directory, named
+    shard_<K>_of_<N>.txt after the shard they belong to.
+    Returns the number of files per manifest path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = [os.path.join(directory, f"{get_shard_label({'shard': (index, count)})}.txt") for index in range(1, count + 1)]
+    files = [open(path, 'w') for path in paths]
+    counts = [0] * count
+    try:
+        for xml_file in xml_files:
+            index = get_shard(xml_file, count) - 1
+            files[index].write(f"{xml_file}\n")
+            counts[index] += 1
+    finally:
+        for manifest_file in files:
+            manifest_file.close()
+    return dict(zip(paths, counts))
+
+
+def merge_logs(paths, output):
+    """
+    Combine the per-shard logs of filepaths into a single sorted log without duplicates.
+    Returns the number of filepaths written.
+    """
+    lines = set()
+    for path in paths:
+        with open(path) as log_file:
+            lines.update(line.rstrip('\n') for line in log_file if line.strip())
+    with open(output, 'w') as log_file:
+        for line in sorted(lines):
+            log_file.write(f"{line}\n")
+    return len(lines)
+
+
+def _merge_histogram(histogram, stage):
+    # Rebuild the histogram from the buckets of a report, see Histogram.to_dict
+    for key, count in stage['buckets_us'].items():
+        index = min(int(key.lstrip('<')).bit_length() - 1, HISTOGRAM_BUCKETS - 1)
+        histogram.buckets[index] += count
+    histogram.count += stage['count']
+    histogram.total += stage['total']
+    if stage['min'] is not None:
+        histogram.min = stage['min'] if histogram.min is None else min(histogram.min, stage['min'])
+    if stage['max'] is not None:
+        histogram.max = stage['max'] if histogram.max is None else max(histogram.max, stage['max'])
+
+
+def merge_reports(paths):
+    """
+    Combine the JSON run reports (see lib.instrument.RunStats) of the shards.
+    Counters and stage histograms are added up. The elapsed time is that of
+    the slowest shard, as the shards run side by side.
+    """
+    reports = []
+    for path in paths:
+        with open(path) as report_file:
+            reports.append(json.load(report_file))
+    counters = {}
+    stages = {}
+    for report in reports:
+        for name, value in report['counters'].items():
+            counters[name] = counters.get(name, 0) + value
+        for name, stage in report['stages'].items():
+            _merge_histogram(stages.setdefault(name, Histogram()), stage)
+    elapsed = max((report['elapsed'] for report in reports), default=0.0)
+    files = sum(report['files'] for report in reports)
+    return {
+        'started': min((report['started'] for report in reports), default=None),
+        'finished': max((report['finished'] for report in reports), default=None),
+        'elapsed': elapsed,
+        'files': files,
+        'files_per_sec': files / elapsed if elapsed else None,
+        'shards': len(reports),
+        'counters': counters,
+        'stages': {name: histogram.to_dict() for name, histogram in stages.items()},
+    }
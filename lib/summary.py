@@ -0,0 +1,140 @@
+import json
+import sys
+import urllib.parse
+from collections import Counter
+
+from lib.products import parse_product_name
+
+# Fields of lib.reader read for the summary of a record
+SUMMARY_FIELDS = ('metadata_status', 'collections', 'odata_url', 'last_metadata_update')
+
+# Stands in for values missing from the record or its name
+UNKNOWN = 'unknown'
+
+
+class RecordSummary:
+    """
+    The few values of an MMD record the archive statistics are made of.
+    Small enough to send back from the workers by the million, unlike an MMD
+    with its tree. The strings are interned, as they take only a few values.
+    """
+
+    __slots__ = ('mission', 'level', 'metadata_status', 'collections', 'odata_host', 'legacy_update')
+
+    def __init__(self, mission, level, metadata_status, collections, odata_host, legacy_update):
+        self.mission = sys.intern(mission)
+        self.level = sys.intern(level)
+        self.metadata_status = sys.intern(metadata_status)
+        self.collections = tuple(sys.intern(collection) for collection in collections)
+        self.odata_host = sys.intern(odata_host)
+        self.legacy_update = legacy_update
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+def summarize_record(mmd):
+    """
+    The RecordSummary of the MMD record, read with the streaming reader.
+    """
+    fields = mmd.read_fields(SUMMARY_FIELDS)
+    product = parse_product_name(mmd.filename)
+    odata_url = fields['odata_url']
+    updates = fields['last_metadata_update']
+    return RecordSummary(
+        product.mission if product else UNKNOWN,
+        product.level if product else UNKNOWN,
+        fields['metadata_status'] or UNKNOWN,
+        fields['collections'],
+        (urllib.parse.urlsplit(odata_url).hostname or UNKNOWN) if odata_url else 'none',
+        # The old format has the datetime as the text of last_metadata_update, without update entries
+        len(updates) == 1 and updates[0][1] is None and updates[0][2] is None,
+    )
+
+
+class ArchiveStatistics:
+    """
+    Counts over the RecordSummary of every record. Only the counters are
+    kept, so the memory used does not grow with the number of records.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.status = Counter()
+        self.collections = Counter()
+        self.odata_hosts = Counter()
+        self.legacy_updates = 0
+
+    def add(self, summary):
+        self.records += 1
+        self.status[(summary.mission, summary.level, summary.metadata_status)] += 1
+        self.collections.update(summary.collections)
+        if not summary.collections:
+            self.collections['none'] += 1
+        self.odata_hosts[summary.odata_host] += 1
+        self.legacy_updates += summary.legacy_update
+
+    def merge(self, other):
+        """
+        Add the counts of another ArchiveStatistics, e.g. of another shard.
+        """
+        self.records += other.records
+        self.status.update(other.status)
+        self.collections.update(other.collections)
+        self.odata_hosts.update(other.odata_hosts)
+        self.legacy_updates += other.legacy_updates
+
+    def to_dict(self):
+        status = {}
+        for (mission, level, metadata_status), count in sorted(self.status.items()):
+            status.setdefault(mission, {}).setdefault(level, {})[metadata_status] = count
+        return {
+            'records': self.records,
+            'status': status,
+            'collections': dict(sorted(self.collections.items())),
+            'odata_hosts': dict(self.odata_hosts.most_common()),
+            'legacy_last_metadata_update': self.legacy_updates,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        statistics = cls()
+        statistics.records = data['records']
+        for mission, levels in data['status'].items():
+            for level, counts in levels.items():
+                for metadata_status, count in counts.items():
+                    statistics.status[(mission, level, metadata_status)] = count
+        statistics.collections.update(data['collections'])
+        statistics.odata_hosts.update(data['odata_hosts'])
+        statistics.legacy_updates = data['legacy_last_metadata_update']
+        return statistics
+
+    def format_text(self):
+        """
+        The statistics as a plain text report.
+        """
+        lines = [f"Records: {self.records}", '', 'metadata_status by mission and level:']
+        statuses = sorted({metadata_status for _, _, metadata_status in self.status})
+        products = sorted({(mission, level) for mission, level, _ in self.status})
+        lines.append(f"  {'mission':8} {'level':6}" + ''.join(f" {metadata_status:>10}" for metadata_status in statuses))
+        for mission, level in products:
+            lines.append(f"  {mission:8} {level:6}" + ''.join(f" {self.status[(mission, level, metadata_status)]:>10}" for metadata_status in statuses))
+        lines += ['', 'Collections:']
+        lines += [f"  {collection:20} {count:>10}" for collection, count in sorted(self.collections.items())]
+        lines += ['', 'ODATA hosts:']
+        lines += [f"  {host:30} {count:>10}" for host, count in self.odata_hosts.most_common()]
+        lines += ['', f"Legacy last_metadata_update (datetime text only): {self.legacy_updates}"]
+        return '\n'.join(lines)
+
+
+def write_statistics(statistics, json_path=None, stream=None):
+    """
+    Print the text report, and write the JSON report if a path is given.
+    """
+    print(statistics.format_text(), file=stream or sys.stdout)
+    if json_path:
+        with open(json_path, 'w') as json_file:
+            json.dump(statistics.to_dict(), json_file, indent=2)
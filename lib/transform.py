@@ -0,0 +1,67 @@
+import argparse
+import functools
+import os
+
+from lxml import etree
+
+STYLESHEET_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xslt')
+
+# The stylesheets shipped in lib/xslt, by name
+STYLESHEETS = {
+    'clean_record': 'clean_record.xsl',
+    'strip_data_access': 'strip_data_access.xsl',
+    'drop_landing_pages': 'drop_landing_pages.xsl',
+    'safe_file_format': 'safe_file_format.xsl',
+    'set_collections': 'set_collections.xsl',
+}
+
+# Compiled stylesheets of the current process, by path.
+# XSLT objects can not be sent to the worker processes, so every worker compiles its own, once.
+_transforms = {}
+
+
+def get_stylesheet_path(stylesheet):
+    """
+    Path of a shipped stylesheet by name, or the given path to any other stylesheet.
+    """
+    if stylesheet in STYLESHEETS:
+        return os.path.join(STYLESHEET_DIRECTORY, STYLESHEETS[stylesheet])
+    return os.path.abspath(stylesheet)
+
+
+def get_transform(stylesheet):
+    """
+    The compiled etree.XSLT for a stylesheet name or path, compiled once per process.
+    """
+    path = get_stylesheet_path(stylesheet)
+    if path not in _transforms:
+        _transforms[path] = etree.XSLT(etree.parse(path))
+    return _transforms[path]
+
+
+def transform_record(stylesheet, params, mmd):
+    """
+    Read the MMD record, apply the stylesheet with the (name, value) string
+    params and write it back if it changed.
+    Returns True if the file was written.
+    """
+    mmd.read()
+    mmd.apply_transform(get_transform(stylesheet), **dict(params))
+    return mmd.write()
+
+
+def get_transform_operation(stylesheet, params=None):
+    """
+    The per-file operation applying the stylesheet, for use with process_in_parallel.
+    """
+    return functools.partial(transform_record, stylesheet, tuple((params or {}).items()))
+
+
+def parse_param(value):
+    """
+    Parse a NAME=VALUE stylesheet parameter from the command line.
+    """
+    name, separator, text = value.partition('=')
+    if not separator or not name:
+        raise argparse.ArgumentTypeError(f"Stylesheet parameters must be NAME=VALUE, not {value!r}")
+    return name, text
@@ -1,25 +1,73 @@
 import os
+import time
 from lxml import etree
-from shapely.geometry import Polygon, box
 from datetime import datetime, timezone
+from lib.reader import read_fields
+from lib.validate import InvalidRecord, validate_tree
+from lib.writeback import write_tree
 
-sios = Polygon([
-    (-20, 70),
-    (-20, 90),
-    (40, 90),
-    (40, 70),
-    (-20, 70)
-    ])
-
-polygon = Polygon([
-    (-20.263238824222373, 84.8852877777822),
-    (-36.25445787748578, 67.02581594412311),
-    (11.148084316116405, 52.31593720759386),
-    (45.98609725358305, 63.94940066151824),
-    (89.96194965005743, 84.8341192704811),
-    (-20.263238824222373, 84.8852877777822),
-    (-20.263238824222373, 84.8852877777822)
-    ])
+# The areas are defined in lib/aois and loaded as prepared geometries on first use,
+# so that scripts not checking extents do not import shapely at all
+_aois = {}
+AOI_NAMES = {'polygon': 'nbs', 'sios': 'sios'}
+
+
+def get_aoi(name):
+    """
+    The shipped area of interest (nbs or sios), loaded once.
+    """
+    if name not in _aois:
+        from lib.aoi import load_default_aoi
+        _aois[name] = load_default_aoi(name)
+    return _aois[name]
+
+
+def __getattr__(name):
+    # The module level polygon and sios geometries, loaded when first used
+    if name in AOI_NAMES:
+        return get_aoi(AOI_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _box(west, south, east, north):
+    from shapely.geometry import box
+    return box(west, south, east, north)
+
+NAMESPACES = {'mmd': 'http://www.met.no/schema/mmd'}
+
+# Paths of the MMD elements used by the MMD methods and the scripts,
+# anchored where the MMD schema puts them instead of searching with .//
+ANCHORED_PATHS = {
+    './/mmd:metadata_status': 'mmd:metadata_status',
+    './/mmd:dataset_production_status': 'mmd:dataset_production_status',
+    './/mmd:collection': 'mmd:collection',
+    './/mmd:last_metadata_update': 'mmd:last_metadata_update',
+    './/mmd:rectangle': 'mmd:geographic_extent/mmd:rectangle',
+    './/mmd:north': 'mmd:geographic_extent/mmd:rectangle/mmd:north',
+    './/mmd:south': 'mmd:geographic_extent/mmd:rectangle/mmd:south',
+    './/mmd:east': 'mmd:geographic_extent/mmd:rectangle/mmd:east',
+    './/mmd:west': 'mmd:geographic_extent/mmd:rectangle/mmd:west',
+    './/mmd:data_access': 'mmd:data_access',
+    './/mmd:data_access[mmd:type="ODATA"]': 'mmd:data_access[mmd:type="ODATA"]',
+    './/mmd:data_access[mmd:type="ODATA"]/mmd:resource': 'mmd:data_access[mmd:type="ODATA"]/mmd:resource',
+    './/mmd:related_information': 'mmd:related_information',
+    './/mmd:storage_information/mmd:file_format': 'mmd:storage_information/mmd:file_format',
+    './/mmd:update': 'mmd:update',
+}
+
+# Compiled XPath objects shared by all MMD objects, filled on first use
+XPATHS = {}
+
+def get_xpath(expression):
+    '''
+    Get the compiled XPath for an expression, using the anchored
+    path for the known MMD elements.
+    '''
+    xpath = XPATHS.get(expression)
+    if xpath is None:
+        xpath = etree.XPath(ANCHORED_PATHS.get(expression, expression), namespaces=NAMESPACES)
+        XPATHS[expression] = xpath
+    return xpath
 
 def get_current_time():
     return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
@@ -29,75 +77,168 @@ class MMD:
     def __init__(self, filepath):
         self.filepath = str(filepath)
         self.filename = os.path.basename(self.filepath)
+        # Set by the mutating methods when they change the document
+        self.modified = False
+        # Seconds spent per stage (read, write, geometry), for the run statistics
+        self.timings = {}
+        # Path to the MMD XSD to validate the record against before writing it, see lib.validate
+        self.schema = None
+
+    def _add_time(self, stage, start):
+        self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
 
     def read(self):
+        start = time.perf_counter()
         self.tree = etree.parse(self.filepath)
         self.root = self.tree.getroot()
         self.ns = self.root.nsmap
+        self.modified = False
+        self._add_time('read', start)
+
+    def read_fields(self, fields):
+        '''
+        Read only the given fields, without building the full tree.
+        See lib.reader.read_fields.
+        '''
+        start = time.perf_counter()
+        record = read_fields(self.filepath, fields)
+        self._add_time('read', start)
+        return record
+
+    def write(self, force=False):
+        '''
+        Write the record back to the file.
+        Records that have not been modified since they were read are
+        not written, unless force is set.
+        With a schema set, the record is validated in memory first and
+        InvalidRecord is raised instead of writing an invalid record.
+        Returns True if the file was written.
+        '''
+        if not (self.modified or force):
+            return False
+        if self.schema is not None:
+            start = time.perf_counter()
+            errors = validate_tree(self.tree, self.schema)
+            self._add_time('validate', start)
+            if errors:
+                raise InvalidRecord(self.filepath, errors)
+        start = time.perf_counter()
+        write_tree(self.tree, self.filepath)
+        self.modified = False
+        self._add_time('write', start)
+        return True
+
+    def find(self, expression, element=None):
+        '''
+        First element matching the expression below the root
+        (or the given element), None if there is none.
+        '''
+        matches = get_xpath(expression)(self.root if element is None else element)
+        return matches[0] if matches else None
+
+    def findall(self, expression, element=None):
+        return get_xpath(expression)(self.root if element is None else element)
 
-    def write(self):
-        self.tree.write(
-            self.filepath,
-            pretty_print=True
-        )
+    def findtext(self, expression, element=None):
+        # Like lxml findtext: empty string for an empty element, None if missing
+        xml_element = self.find(expression, element)
+        if xml_element is None:
+            return None
+        return xml_element.text or ''
 
     def update_element(self, element_name, element_value, language=None):
-        xml_element = self.root.find(
-            element_name,
-            namespaces=self.ns
-        )
+        xml_element = self.find(element_name)
         if xml_element is not None:
-            xml_element.text = element_value
+            if xml_element.text != element_value:
+                xml_element.text = element_value
+                self.modified = True
         else:
             pass
 
     def remove_element(self, element):
         # Find all instances of element
-        xml_element_list = self.root.findall(
-            element,
-            namespaces=self.ns
-        )
+        xml_element_list = self.findall(element)
         for xml_element in xml_element_list[:]:
             if xml_element is not None:
                 xml_element.getparent().remove(xml_element)
+                self.modified = True
 
     def check_element_exists(self, element_name):
-        xml_element = self.root.find(
-            element_name,
-            namespaces=self.ns
-        )
+        xml_element = self.find(element_name)
         if xml_element is not None:
             return True
         else:
             return False
 
+    def get_element_text(self, element_name):
+        xml_element = self.find(element_name)
+        if xml_element is not None and xml_element.text is not None:
+            return xml_element.text.strip()
+        return None
+
+    def get_collections(self):
+        return [
+            collection.text.strip()
+            for collection in self.findall('mmd:collection')
+            if collection.text
+        ]
+
+    def get_odata_access_url(self):
+        return self.get_element_text('.//mmd:data_access[mmd:type="ODATA"]/mmd:resource')
+
+    def get_last_metadata_updates(self):
+        '''
+        List the entries of last_metadata_update as (datetime, type, note).
+        Records still using the old format, with only a datetime as text,
+        give a single entry with type and note set to None.
+        '''
+        last_metadata_update = self.find('mmd:last_metadata_update')
+        if last_metadata_update is None:
+            return []
+        updates = []
+        for update in self.findall('mmd:update', last_metadata_update):
+            updates.append((
+                self.findtext('mmd:datetime', update),
+                self.findtext('mmd:type', update),
+                self.findtext('mmd:note', update),
+            ))
+        if not updates and last_metadata_update.text and last_metadata_update.text.strip():
+            updates.append((last_metadata_update.text.strip(), None, None))
+        return updates
+
     def get_geospatial_extents(self):
         # Extract the geographic extent coordinates
-        self.north = float(self.root.xpath('.//mmd:north', namespaces=self.ns)[0].text)
-        self.south = float(self.root.xpath('.//mmd:south', namespaces=self.ns)[0].text)
-        self.west = float(self.root.xpath('.//mmd:west', namespaces=self.ns)[0].text)
-        self.east = float(self.root.xpath('.//mmd:east', namespaces=self.ns)[0].text)
+        self.north = float(self.findall('.//mmd:north')[0].text)
+        self.south = float(self.findall('.//mmd:south')[0].text)
+        self.west = float(self.findall('.//mmd:west')[0].text)
+        self.east = float(self.findall('.//mmd:east')[0].text)
 
     def check_if_within_polygon(self):
+        start = time.perf_counter()
 
         # Create a shapely box (rectangle) from the geographic extent
-        extent_box = box(self.west, self.south, self.east, self.north)
+        extent_box = _box(self.west, self.south, self.east, self.north)
 
         # Check if the extent box overlaps with the given polygon
-        return extent_box.intersects(polygon) # Returns True or False
+        within = extent_box.intersects(get_aoi('nbs'))
+        self._add_time('geometry', start)
+        return within # Returns True or False
 
     def check_if_within_sios(self):
+        start = time.perf_counter()
 
         # Create a shapely box (rectangle) from the geographic extent
-        extent_box = box(self.west, self.south, self.east, self.north)
+        extent_box = _box(self.west, self.south, self.east, self.north)
 
         # Check if the extent box overlaps with the given polygon
-        return extent_box.intersects(sios) # Returns True or False
+        within = extent_box.intersects(get_aoi('sios'))
+        self._add_time('geometry', start)
+        return within # Returns True or False
 
     def add_collection(self, collection):
 
         # Find the index of dataset_production_status
-        dps_element = self.root.xpath(".//mmd:dataset_production_status", namespaces=self.ns)[0]
+        dps_element = self.findall(".//mmd:dataset_production_status")[0]
         dps_index = list(self.root).index(
             dps_element
             )
@@ -107,6 +248,7 @@ class MMD:
         new_element.text = collection
         self.root.insert(dps_index + 1, new_element)
         new_element.tail = "\n  "  # Proper indentation
+        self.modified = True
 
     def update_odata_access_url(self):
         '''
@@ -121,10 +263,10 @@ class MMD:
         within_aoi = self.check_if_within_polygon()
         if within_aoi:
             # Find the data_access element with type ODATA
-            data_access = self.root.find('.//mmd:data_access[mmd:type="ODATA"]', self.ns)
+            data_access = self.find('.//mmd:data_access[mmd:type="ODATA"]')
 
             if data_access is not None:
-                resource = data_access.find('mmd:resource', self.ns)
+                resource = self.find('mmd:resource', data_access)
 
                 if resource is not None:
                     original_url = resource.text
@@ -132,6 +274,7 @@ class MMD:
 
                     if original_url != updated_url:
                         resource.text = updated_url
+                        self.modified = True
                         print(f"Updated resource URL: {updated_url}")
                     else:
                         print("No update needed for the resource URL.")
@@ -140,20 +283,31 @@ class MMD:
         else:
             self.update_element('.//mmd:metadata_status', 'Inactive')
 
-    # def update_xml_version(self, transform):
-    #     result = transform(self.tree)
-    #     self.tree = result
-    # The XSLT file is deleting everything from the platform and instrumentation elements.
+    def apply_transform(self, transform, **params):
+        '''
+        Apply a compiled XSLT (see lib.transform) to the record, with string params.
+        The record is only marked as modified if the result differs.
+        The stylesheets in lib/xslt copy everything they do not change,
+        including the platform and instrument elements.
+        '''
+        start = time.perf_counter()
+        result = transform(self.tree, **{name: etree.XSLT.strparam(value) for name, value in params.items()})
+        if etree.tostring(result) != etree.tostring(self.tree):
+            self.tree = result
+            self.root = result.getroot()
+            self.ns = self.root.nsmap
+            self.modified = True
+        self._add_time('transform', start)
 
     def update_last_metadata_update(self):
 
         # Find the last_metadata_update element
-        last_metadata_update = self.root.find('.//mmd:last_metadata_update', self.ns)
+        last_metadata_update = self.find('.//mmd:last_metadata_update')
 
         if last_metadata_update is not None:
             # Check if it contains a direct datetime text
             datetime_text = last_metadata_update.text.strip() if last_metadata_update.text else None
-            if datetime_text and last_metadata_update.find('.//mmd:update', self.ns) is None:
+            if datetime_text and self.find('.//mmd:update', last_metadata_update) is None:
                 # Create the new structure
                 update_elem = etree.Element('{http://www.met.no/schema/mmd}update')
 
@@ -177,12 +331,16 @@ class MMD:
                 last_metadata_update.text = '\n    '
                 last_metadata_update[-1].tail = '\n  '
                 last_metadata_update.tail = '\n  '
+                self.modified = True
 
 
     def set_to_inactive(self):
         '''
         Set product to inactive
+        Nothing is changed or logged for a product that is Inactive already
         '''
+        if self.get_element_text('.//mmd:metadata_status') == 'Inactive':
+            return
         self.update_element('.//mmd:metadata_status', 'Inactive')
         self.log_change('Major modification', 'Product has been deleted')
 
@@ -205,7 +363,7 @@ class MMD:
         '''
 
         # Find the last_metadata_update element
-        last_metadata_update = self.root.find("mmd:last_metadata_update", namespaces=self.ns)
+        last_metadata_update = self.find("mmd:last_metadata_update")
 
         update = {
             'datetime': get_current_time(),
@@ -232,17 +390,5 @@ class MMD:
 
         last_metadata_update.append(update_element)
         last_metadata_update[-2].tail = '\n    '
+        self.modified = True
 
-
-def find_xml_files(directory, product_type):
-    """
-    Find all XML files in the metadata directories for the given product type.
-    Scans all subdirectories of the given directory
-    Returns a list of filepaths to the XML files
-    """
-    xml_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".xml") and file.startswith("S"):
-                xml_files.append(os.path.join(root, file))
-    return xml_files
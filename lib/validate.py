@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+from lxml import etree
+
+# Environment variable with the path to the MMD XSD, used when no schema is given
+SCHEMA_ENVIRONMENT_VARIABLE = 'MMD_SCHEMA'
+
+# Compiled schemas by path, process and thread.
+# XMLSchema objects can not be sent to the worker processes, so every worker loads its own, once.
+# The error_log of a schema is overwritten by every validation, so the threads
+# of the threads mode can not share one either.
+_schemas = {}
+
+
+class InvalidRecord(ValueError):
+    """
+    The record is not valid against the MMD schema.
+    """
+
+    def __init__(self, filepath, errors):
+        super().__init__(f"{filepath} is not valid MMD:\n" + '\n'.join(errors))
+        self.filepath = filepath
+        self.errors = errors
+
+
+def get_schema_path(schema=None):
+    """
+    The path to the MMD XSD: the given path, or else the MMD_SCHEMA environment variable.
+    The schema is read from disk only (including its includes and imports), never over the network.
+    """
+    schema = schema or os.environ.get(SCHEMA_ENVIRONMENT_VARIABLE)
+    if not schema:
+        raise ValueError(f"No MMD schema given, pass a path to the XSD or set {SCHEMA_ENVIRONMENT_VARIABLE}")
+    return os.path.abspath(schema)
+
+
+def get_schema(schema=None):
+    """
+    The compiled etree.XMLSchema for the schema path, loaded once per process and thread.
+    """
+    key = (get_schema_path(schema), os.getpid(), threading.get_ident())
+    if key not in _schemas:
+        parser = etree.XMLParser(no_network=True)
+        _schemas[key] = etree.XMLSchema(etree.parse(key[0], parser))
+    return _schemas[key]
+
+
+def validate_tree(tree, schema=None):
+    """
+    Validate a parsed (or modified, in memory) tree against the schema.
+    Returns the validation errors as "line: message" strings, empty if the tree is valid.
+    """
+    xml_schema = get_schema(schema)
+    if xml_schema.validate(tree):
+        return []
+    # Never empty for an invalid tree, callers test the list
+    return [f"{error.line}: {error.message}" for error in xml_schema.error_log] or ['0: not valid against the schema']
+
+
+def validate_record(schema, mmd):
+    """
+    Read the MMD record and validate it against the schema.
+    Returns the validation errors, empty if the record is valid.
+    """
+    mmd.read()
+    start = time.perf_counter()
+    errors = validate_tree(mmd.tree, schema)
+    mmd._add_time('validate', start)
+    return errors
@@ -0,0 +1,153 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from lib.index import MMDIndex
+
+# inotify event masks, see inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event without the name: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+# Seconds between index refreshes when polling
+DEFAULT_POLL_INTERVAL = 60.0
+
+
+class InotifyWatcher:
+    """
+    Report the files written or moved into the tree below directory, using
+    inotify through libc. New directories are watched as they are created.
+    Raises OSError if inotify is not available, e.g. not on Linux or when
+    the limit of watches (fs.inotify.max_user_watches) is too low for the tree.
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(str(directory))
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}
+        try:
+            self._add_tree(self.directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                # Removed again before it could be watched
+                return
+            raise OSError(error, f"inotify_add_watch failed for {path}")
+        self.watches[wd] = path
+
+    def _add_tree(self, directory):
+        """
+        Watch directory and all directories below it.
+        Returns the files already in them, which were written before the watches were in place.
+        """
+        files = []
+        stack = [directory]
+        while stack:
+            path = stack.pop()
+            self._add_watch(path)
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for events.
+        Returns the paths of the files written, and None instead if events
+        were lost (the queue overflowed), as then the whole tree has to be checked.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 1024 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches:
+                continue
+            path = os.path.join(self.watches[wd], os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    paths.extend(self._add_tree(path))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                paths.append(path)
+        return paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class IndexPoller:
+    """
+    Report the new and changed files below directory by refreshing the
+    SQLite index (see lib.index) every interval seconds, for where inotify
+    is not available. Only the changed files are parsed by a refresh.
+    """
+
+    def __init__(self, index_path, directory, product_type=None, discovery=None, execution=None, interval=DEFAULT_POLL_INTERVAL):
+        self.index = MMDIndex(index_path)
+        self.directory = os.path.abspath(str(directory))
+        self.product_type = product_type
+        self.discovery = discovery
+        self.execution = execution
+        self.interval = interval
+        # Bring the index up to date first, only later changes are reported
+        self.index.refresh(self.directory, product_type, discovery, execution)
+        self.next_poll = time.monotonic() + interval
+
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds, refreshing the index if it is due by then.
+        Returns the paths of the new or changed files.
+        """
+        delay = self.next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        time.sleep(max(delay, 0.0))
+        changed = []
+        self.index.refresh(self.directory, self.product_type, self.discovery, self.execution, changed)
+        self.next_poll = time.monotonic() + self.interval
+        return changed
+
+    def close(self):
+        self.index.close()
@@ -0,0 +1,256 @@
+import gzip
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import traceback
+from datetime import datetime, timezone
+
+from lxml import etree
+
+# When the written files are flushed to disk: never (left to the kernel),
+# for every file, or for every batch of files
+FSYNC_MODES = ('none', 'file', 'batch')
+
+# Number of files per fsync batch
+DEFAULT_SYNC_EVERY = 1000
+
+# The writes deferred by the task running in the current thread, see defer_writes
+_local = threading.local()
+
+
+def _write_temporary(filepath, data):
+    """
+    Write data to a new temporary file in the directory of filepath, with the
+    mode, and where permitted the owner and group, of filepath.
+    Returns the path of the temporary file.
+    """
+    directory = os.path.dirname(filepath)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filepath)}.", suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as temporary_file:
+            temporary_file.write(data)
+        if os.path.exists(filepath):
+            stat = os.stat(filepath)
+            os.chmod(temporary, stat.st_mode)
+            _copy_owner(temporary, stat)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return temporary
+
+
+def _copy_owner(temporary, stat):
+    # Only root can give a file away, others can still keep the group if they are in it
+    for uid, gid in ((stat.st_uid, stat.st_gid), (-1, stat.st_gid)):
+        try:
+            os.chown(temporary, uid, gid)
+            return
+        except PermissionError:
+            continue
+
+
+def write_file(filepath, data):
+    """
+    Replace the file with data in one step, via a temporary file in the same
+    directory, so that the file is never seen (or left, after a crash) partly written.
+    The new file gets the mode, owner and group of the old one, as far as the
+    user running the job is permitted to set them: otherwise it is owned by that
+    user (and their group, if the old group can not be kept).
+    A symbolic link is kept, the file it points to is replaced.
+    Inside defer_writes the temporary file is only written, and renamed
+    over the file later by WriteBack in the main process.
+    """
+    filepath = os.path.realpath(filepath)
+    temporary = _write_temporary(filepath, data)
+    deferred = getattr(_local, 'deferred', None)
+    if deferred is not None:
+        deferred.append((temporary, filepath))
+        return
+    try:
+        os.replace(temporary, filepath)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def write_tree(tree, filepath):
+    """
+    Write an lxml tree to the file as tree.write(filepath, pretty_print=True) does, but with write_file.
+    """
+    write_file(filepath, etree.tostring(tree, pretty_print=True))
+
+
+def defer_writes():
+    """
+    Collect the writes of the current thread, instead of renaming the temporary files, until collect_writes.
+    """
+    _local.deferred = []
+
+
+def collect_writes():
+    """
+    The (temporary, filepath) of the writes since defer_writes, which ends collecting them.
+    """
+    writes = getattr(_local, 'deferred', None) or []
+    _local.deferred = None
+    return tuple(writes)
+
+
+def discard_writes(writes):
+    for temporary, _ in writes:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _fsync(path):
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class BackupArchive:
+    """
+    Gzip compressed tar archive of the original files, created in directory
+    as mmd_backup_<time>.tar.gz. Members are named by the absolute path of
+    the file without the leading /, so `tar -xzf ARCHIVE -C /` (or
+    restore_backup.py) puts the originals back.
+    sync makes everything added so far durable, the archive stays readable
+    up to there even if the run is killed before close.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        self.path = os.path.join(directory, f"mmd_backup_{stamp}.tar.gz")
+        self._raw = open(self.path, 'xb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        self._tar = tarfile.open(fileobj=self._gzip, mode='w', format=tarfile.PAX_FORMAT)
+        self.files = 0
+
+    def add(self, filepath):
+        filepath = os.path.abspath(filepath)
+        with open(filepath, 'rb') as original:
+            stat = os.fstat(original.fileno())
+            data = original.read()
+        info = tarfile.TarInfo(filepath.lstrip('/'))
+        info.size = len(data)
+        info.mtime = stat.st_mtime
+        info.mode = stat.st_mode & 0o7777
+        self._tar.addfile(info, io.BytesIO(data))
+        self.files += 1
+
+    def sync(self):
+        self._gzip.flush()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def close(self):
+        self._tar.close()
+        self._gzip.close()
+        self._raw.close()
+
+
+class WriteBack:
+    """
+    Put the writes deferred by the workers (see defer_writes) in place, in
+    the main process, in batches: flush the new files to disk, add the
+    originals to the backup archive, rename the new files over the
+    originals and flush the directories, each directory once per batch.
+    With fsync 'none' and no backup_dir the workers rename the files
+    themselves and nothing is deferred.
+    """
+
+    def __init__(self, fsync='none', backup_dir=None, sync_every=DEFAULT_SYNC_EVERY):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"Unknown fsync mode {fsync}, choose from {', '.join(FSYNC_MODES)}")
+        self.fsync = fsync
+        self.backup_dir = backup_dir
+        self.batch_size = sync_every if fsync == 'batch' else 1
+        self.backup = None
+
+    @property
+    def deferred(self):
+        return self.fsync != 'none' or self.backup_dir is not None
+
+    def commit(self, file_results):
+        """
+        Yield the file results once their writes are in place.
+        A file whose write can not be put in place is reported as failed.
+        """
+        batch = []
+        try:
+            for file_result in file_results:
+                batch.append(file_result)
+                if len(batch) >= self.batch_size:
+                    # Taken out of batch first, so a failing commit is not repeated below
+                    pending, batch = batch, []
+                    yield from self._commit(pending)
+            pending, batch = batch, []
+            yield from self._commit(pending)
+        finally:
+            # Stopped early (the caller stopped, or the workers failed): the work in the batch is done, keep it
+            self._commit(batch)
+            if self.backup is not None:
+                self.backup.close()
+                print(f"Backed up {self.backup.files} original files in {self.backup.path}")
+                self.backup = None
+
+    def _commit(self, batch):
+        writes = [write for file_result in batch for write in file_result.writes]
+        if not writes:
+            return batch
+        try:
+            if self.fsync != 'none':
+                for temporary, _ in writes:
+                    _fsync(temporary)
+            if self.backup_dir is not None:
+                if self.backup is None:
+                    self.backup = BackupArchive(self.backup_dir)
+                for _, filepath in writes:
+                    if os.path.exists(filepath):
+                        self.backup.add(filepath)
+                # The originals are safe before any of them is replaced
+                self.backup.sync()
+        except BaseException:
+            # None of the batch has been put in place
+            discard_writes(writes)
+            raise
+
+        committed = []
+        for file_result in batch:
+            error = None
+            for temporary, filepath in file_result.writes:
+                try:
+                    os.replace(temporary, filepath)
+                except OSError:
+                    error = traceback.format_exc()
+                    discard_writes([(temporary, filepath)])
+            committed.append(file_result._replace(error=error) if error else file_result)
+
+        if self.fsync != 'none':
+            for directory in {os.path.dirname(os.path.abspath(filepath)) for _, filepath in writes}:
+                _fsync(directory)
+        return committed
+
+
+
+def restore_backup(archive_path, dry_run=False):
+    """
+    Put the original files in a BackupArchive back, each with write_file and its original mtime.
+    Yields the path of every file restored (or, with dry_run, that would be).
+    A truncated archive, of a run that was killed, is restored up to where it ends.
+    """
+    with tarfile.open(archive_path, 'r:gz') as archive:
+        try:
+            for member in archive:
+                filepath = '/' + member.name
+                if not dry_run:
+                    write_file(filepath, archive.extractfile(member).read())
+                    os.utime(filepath, (member.mtime, member.mtime))
+                yield filepath
+        except (EOFError, tarfile.ReadError):
+            print(f"{archive_path} ends early, restored the files up to there")
@@ -0,0 +1,31 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!--
+  The clean up of clean_mmd_records.py in one pass:
+  strip_data_access.xsl, drop_landing_pages.xsl and safe_file_format.xsl.
+  Everything else, including platform and instrument, is copied unchanged.
+-->
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+    xmlns:mmd="http://www.met.no/schema/mmd">
+
+  <xsl:template match="@*|node()">
+    <xsl:copy>
+      <xsl:apply-templates select="@*|node()"/>
+    </xsl:copy>
+  </xsl:template>
+
+  <!-- The whitespace after a removed element goes with it -->
+  <xsl:template match="mmd:data_access[not(mmd:type[1] = 'ODATA')]"/>
+  <xsl:template match="text()[not(normalize-space())][preceding-sibling::node()[1][self::mmd:data_access[not(mmd:type[1] = 'ODATA')]]]"/>
+
+  <xsl:template match="mmd:related_information[mmd:type[1] = 'Dataset landing page']"/>
+  <xsl:template match="text()[not(normalize-space())][preceding-sibling::node()[1][self::mmd:related_information[mmd:type[1] = 'Dataset landing page']]]"/>
+
+  <xsl:template match="mmd:storage_information/mmd:file_format">
+    <xsl:copy>
+      <xsl:apply-templates select="@*"/>
+      <xsl:text>SAFE</xsl:text>
+    </xsl:copy>
+  </xsl:template>
+
+</xsl:stylesheet>
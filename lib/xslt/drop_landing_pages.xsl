@@ -0,0 +1,20 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!--
+  Remove the related_information links to the dataset landing pages on THREDDS.
+  Everything else, including platform and instrument, is copied unchanged.
+-->
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+    xmlns:mmd="http://www.met.no/schema/mmd">
+
+  <xsl:template match="@*|node()">
+    <xsl:copy>
+      <xsl:apply-templates select="@*|node()"/>
+    </xsl:copy>
+  </xsl:template>
+
+  <!-- The whitespace after a removed element goes with it -->
+  <xsl:template match="mmd:related_information[mmd:type[1] = 'Dataset landing page']"/>
+  <xsl:template match="text()[not(normalize-space())][preceding-sibling::node()[1][self::mmd:related_information[mmd:type[1] = 'Dataset landing page']]]"/>
+
+</xsl:stylesheet>
@@ -0,0 +1,23 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!--
+  Set the file_format in storage_information to SAFE.
+  Everything else, including platform and instrument, is copied unchanged.
+-->
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+    xmlns:mmd="http://www.met.no/schema/mmd">
+
+  <xsl:template match="@*|node()">
+    <xsl:copy>
+      <xsl:apply-templates select="@*|node()"/>
+    </xsl:copy>
+  </xsl:template>
+
+  <xsl:template match="mmd:storage_information/mmd:file_format">
+    <xsl:copy>
+      <xsl:apply-templates select="@*"/>
+      <xsl:text>SAFE</xsl:text>
+    </xsl:copy>
+  </xsl:template>
+
+</xsl:stylesheet>
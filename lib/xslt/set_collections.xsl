@@ -0,0 +1,51 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!--
+  Replace the collection elements with the comma separated collections
+  parameter (e.g. NBS,SIOS), placed after dataset_production_status.
+  Everything else, including platform and instrument, is copied unchanged.
+-->
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+    xmlns:mmd="http://www.met.no/schema/mmd">
+
+  <xsl:param name="collections" select="'NBS'"/>
+
+  <xsl:template match="@*|node()">
+    <xsl:copy>
+      <xsl:apply-templates select="@*|node()"/>
+    </xsl:copy>
+  </xsl:template>
+
+  <!-- The whitespace after a removed element goes with it -->
+  <xsl:template match="mmd:collection"/>
+  <xsl:template match="text()[not(normalize-space())][preceding-sibling::node()[1][self::mmd:collection]]"/>
+
+  <!-- The new collections follow the whitespace after dataset_production_status -->
+  <xsl:template match="/mmd:mmd/mmd:dataset_production_status">
+    <xsl:copy>
+      <xsl:apply-templates select="@*|node()"/>
+    </xsl:copy>
+    <xsl:if test="not(following-sibling::node()[1][self::text()])">
+      <xsl:call-template name="collections"/>
+    </xsl:if>
+  </xsl:template>
+  <xsl:template match="/mmd:mmd/text()[preceding-sibling::node()[1][self::mmd:dataset_production_status]]">
+    <xsl:copy/>
+    <xsl:call-template name="collections"/>
+  </xsl:template>
+
+  <xsl:template name="collections">
+    <xsl:param name="remaining" select="concat($collections, ',')"/>
+    <xsl:variable name="collection" select="normalize-space(substring-before($remaining, ','))"/>
+    <xsl:if test="$collection">
+      <mmd:collection><xsl:value-of select="$collection"/></mmd:collection>
+      <xsl:text>&#10;  </xsl:text>
+    </xsl:if>
+    <xsl:if test="contains(substring-after($remaining, ','), ',')">
+      <xsl:call-template name="collections">
+        <xsl:with-param name="remaining" select="substring-after($remaining, ',')"/>
+      </xsl:call-template>
+    </xsl:if>
+  </xsl:template>
+
+</xsl:stylesheet>
@@ -0,0 +1,20 @@
+<?xml version="1.0" encoding="UTF-8"?>
+<!--
+  Remove all data_access elements apart from the ODATA one.
+  Everything else, including platform and instrument, is copied unchanged.
+-->
+<xsl:stylesheet version="1.0"
+    xmlns:xsl="http://www.w3.org/1999/XSL/Transform"
+    xmlns:mmd="http://www.met.no/schema/mmd">
+
+  <xsl:template match="@*|node()">
+    <xsl:copy>
+      <xsl:apply-templates select="@*|node()"/>
+    </xsl:copy>
+  </xsl:template>
+
+  <!-- The whitespace after a removed element goes with it -->
+  <xsl:template match="mmd:data_access[not(mmd:type[1] = 'ODATA')]"/>
+  <xsl:template match="text()[not(normalize-space())][preceding-sibling::node()[1][self::mmd:data_access[not(mmd:type[1] = 'ODATA')]]]"/>
+
+</xsl:stylesheet>
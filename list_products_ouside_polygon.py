@@ -1,35 +1,99 @@
 import os
-from lib.utils import MMD, find_xml_files
-import argparse
+from lib.cli import add_archive_arguments, run_script
+from lib.aoi import classify_records, parse_aoi_argument, load_default_aoi
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.index import MMDIndex, add_index_arguments
+from lib.shard import get_shard_label
 
-def process_files(directory, product_type):
+def get_extents(mmd):
     """
-    Process XML files and remove data access elements if the corresponding NC file does not exist.
+    Get the geographic extent of the MMD record as (west, south, east, north).
+    The record is parsed in full, as in has_collection of check_mmd_collection.py.
     """
-    xml_files = find_xml_files(directory, product_type)
+    mmd.read()
+    mmd.get_geospatial_extents()
+    return mmd.west, mmd.south, mmd.east, mmd.north
+
+def get_log_file_path(product_type, label=None):
     script_directory = os.path.dirname(os.path.abspath(__file__))
-    log_file_path = os.path.join(script_directory, f"products_outside_polygon_{product_type}.txt")
+    suffix = f"_{label}" if label else ''
+    return os.path.join(script_directory, f"products_outside_polygon_{product_type}{suffix}.txt")
 
-    with open(log_file_path, 'a') as log_file:
-        for xml_file in xml_files:
-            mmd = MMD(xml_file)
-            mmd.read()
-            within_polygon = mmd.check_if_within_polygon() # Returns True or False
-            if not within_polygon:
-                log_file.write(f"{xml_file}\n")
+def log_products_outside(records, aoi, log_file):
+    """
+    Classify (path, west, south, east, north) records in batches
+    and log the products that do not overlap the area of interest.
+    """
+    outside = 0
+    for path, within in classify_records(records, {'aoi': aoi}):
+        if not within['aoi']:
+            log_file.write(f"{path}\n")
+            outside += 1
+    return outside
+
+def process_files(directory, product_type, discovery=None, execution=None, aoi=None, instrumentation=None):
+    """
+    Process XML files and list the products whose extent does not overlap the area of interest.
+    """
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+    log_file_path = get_log_file_path(product_type, get_shard_label(discovery))
+
+    def extents():
+        for file_result in stats.track(process_in_parallel(xml_files, get_extents, **(execution or {}))):
+            if file_result.error:
+                print_failure(file_result)
             else:
-                print(xml_file, 'within polygon')
+                yield (file_result.filepath,) + file_result.result
+
+    with open(log_file_path, 'a') as log_file:
+        outside = log_products_outside(extents(), aoi if aoi is not None else load_default_aoi('nbs'), log_file)
+    stats.count('outside', outside)
+    stats.finish()
+
+def process_index(index_path, directory, product_type, discovery=None, execution=None, refresh=True, aoi=None):
+    """
+    Answer from the SQLite index of the MMD records instead of reading every file.
+    Only new or changed files are parsed when refreshing the index, and only
+    the records near the area of interest are tested against it (see MMDIndex.query_aoi).
+    """
+    with MMDIndex(index_path) as index:
+        if refresh:
+            print(index.refresh(directory, product_type, discovery, execution))
+        paths = index.query_aoi(aoi if aoi is not None else load_default_aoi('nbs'), directory, product_type, outside=True)
+    with open(get_log_file_path(product_type), 'a') as log_file:
+        for path in paths:
+            log_file.write(f"{path}\n")
+    outside = len(paths)
+    print(f"{outside} products outside the area of interest")
+
+DESCRIPTION = 'List the products whose geographic extent does not overlap the area of interest.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser)
+    parser.add_argument('--aoi', type=parse_aoi_argument, default='nbs', help='Area of interest as a GeoJSON/WKT file or WKT string, or nbs/sios (default: nbs)')
+    add_index_arguments(parser)
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    aoi_name, aoi = args.aoi
+    if args.index:
+        process_index(args.index, args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), not args.no_refresh, aoi)
+    else:
+        process_files(args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), aoi, get_instrumentation_options(args))
 
 def main():
     """
     Main function to parse arguments and initiate the process.
     """
-    parser = argparse.ArgumentParser(description='Process XML files to remove data access elements if corresponding NC file is not found.')
-    parser.add_argument('directory', type=str, help='Top level directory to search')
-    parser.add_argument('product_type', type=str, help='Product type to search for (e.g., S2A, S1A)')
-
-    args = parser.parse_args()
-    process_files(args.directory, args.product_type)
+    run_script(DESCRIPTION, configure_parser, run)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,34 @@
+import os
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.shard import write_manifests
+
+DESCRIPTION = 'Find the XML files once and split them over N shard manifests, to process the shards on several nodes with --manifest.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, execution=False, instrumentation=False)
+    parser.add_argument('--shards', type=int, required=True, help='Number of shards')
+    parser.add_argument('--output-dir', type=str, default='manifests', help='Directory to write the shard_<K>_of_<N>.txt manifests to (default: manifests)')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    if args.shards < 1:
+        raise SystemExit('--shards must be at least 1')
+    discovery = get_discovery_options(args)
+    xml_files = find_xml_files(os.path.abspath(args.directory), args.product_type, **discovery)
+    for path, count in write_manifests(xml_files, args.output_dir, args.shards).items():
+        print(f"{path}: {count} files")
+
+def main():
+    """
+    Main function to parse arguments and write the manifests.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import json
+from lib.cli import run_script
+from lib.shard import merge_logs, merge_reports
+from lib.summary import ArchiveStatistics, write_statistics
+
+DESCRIPTION = 'Combine the logs (e.g. missing_collection_*.txt, products_outside_polygon_*.txt), JSON run reports or statistics of the shards of a run.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    subparsers = parser.add_subparsers(dest='kind', required=True)
+    logs_parser = subparsers.add_parser('logs', help='Merge the logs of filepaths into one sorted log')
+    logs_parser.add_argument('output', type=str, help='Merged log file')
+    logs_parser.add_argument('inputs', type=str, nargs='+', help='Logs of the shards')
+    reports_parser = subparsers.add_parser('reports', help='Merge the --report summaries into one')
+    reports_parser.add_argument('output', type=str, help='Merged JSON report')
+    reports_parser.add_argument('inputs', type=str, nargs='+', help='JSON reports of the shards')
+    statistics_parser = subparsers.add_parser('statistics', help='Add up the archive_statistics.py --json statistics')
+    statistics_parser.add_argument('output', type=str, help='Combined JSON statistics')
+    statistics_parser.add_argument('inputs', type=str, nargs='+', help='JSON statistics of the shards')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    if args.kind == 'logs':
+        print(f"{merge_logs(args.inputs, args.output)} files in {args.output}")
+    elif args.kind == 'statistics':
+        statistics = ArchiveStatistics()
+        for path in args.inputs:
+            with open(path) as statistics_file:
+                statistics.merge(ArchiveStatistics.from_dict(json.load(statistics_file)))
+        write_statistics(statistics, args.output)
+    else:
+        summary = merge_reports(args.inputs)
+        with open(args.output, 'w') as report_file:
+            json.dump(summary, report_file, indent=2)
+        print(f"{summary['files']} files from {summary['shards']} shards in {args.output}")
+
+def main():
+    """
+    Main function to parse arguments and merge the shard outputs.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
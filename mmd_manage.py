@@ -0,0 +1,76 @@
+import argparse
+import importlib
+import sys
+
+# The scripts by subcommand: module and a one line description.
+# A script is only imported when its subcommand is run, so that listing the
+# commands, or running one, does not pay for importing all the others.
+# Every script has a configure_parser(parser) adding its arguments, and a
+# run(args) running it with the parsed arguments.
+COMMANDS = {
+    'check-collection': ('check_mmd_collection', 'List the records without a collection'),
+    'clean': ('clean_mmd_records', 'Remove the data access of records whose NetCDF file is gone'),
+    'update-collection': ('update_mmd_collection', 'Set the NBS/SIOS collections from the extent'),
+    'update-odata-url': ('update_odata_access_url', 'Move the ODATA access URLs to colhub-archive'),
+    'update-last-update': ('update_last_metadata_update', 'Convert last_metadata_update to the update entries format'),
+    'set-status': {
+        'old-s2-l1c-active': ('set_old_S2_L1C_products_to_active', 'Set old S2 L1C products inside the area to Active'),
+        'old-s2-l1c-inactive': ('set_old_S2_L1C_products_to_inactive', 'Set old S2 L1C products to Inactive'),
+        'old-s2-oper-inactive': ('set_old_S2_OPER_products_to_inactive', 'Set the S2 OPER products to Inactive'),
+    },
+    'superseded': ('find_superseded_products', 'List (or deactivate) older versions and duplicates of products'),
+    'pipeline': ('run_pipeline', 'Apply several maintenance steps in one pass over the records'),
+    'apply-stylesheet': ('apply_stylesheet', 'Apply one of the XSLT stylesheets to the records'),
+    'list-outside': ('list_products_ouside_polygon', 'List the products outside the area of interest'),
+    'query-extents': ('query_extents', 'Query the products intersecting an area from the index'),
+    'statistics': ('archive_statistics', 'Count the records by status, collection and ODATA host'),
+    'validate': ('validate_mmd_records', 'Validate the records against the MMD schema'),
+    'export': ('export_mmd_records', 'Export the records as JSON Lines'),
+    'watch': ('watch_mmd_records', 'Apply maintenance steps to new or changed records as they arrive'),
+    'make-manifests': ('make_manifests', 'Split the records into shard manifests'),
+    'restore-backup': ('restore_backup', 'Put back the original records kept by a run with --backup-dir'),
+    'merge-shards': ('merge_shards', 'Combine the logs, reports or statistics of the shards of a run'),
+}
+
+
+def add_commands(parser, commands, argv):
+    """
+    Add the commands as subparsers of parser. Only the script of the command
+    in argv is imported, to add its arguments to its subparser with the
+    configure_parser of the script, and to set its run as the function to run.
+    """
+    subparsers = parser.add_subparsers(title='commands', metavar='COMMAND', required=True)
+    for name, command in commands.items():
+        chosen = argv[:1] == [name]
+        if isinstance(command, dict):
+            subparser = subparsers.add_parser(name, help=', '.join(command), description=f"Commands: {', '.join(command)}")
+            add_commands(subparser, command, argv[1:] if chosen else [])
+            continue
+        module_name, description = command
+        subparser = subparsers.add_parser(name, help=description, description=description)
+        if chosen:
+            module = importlib.import_module(module_name)
+            subparser.description = module.DESCRIPTION
+            module.configure_parser(subparser)
+            subparser.set_defaults(run=module.run)
+
+
+def run(argv, commands=COMMANDS, prog='mmd-manage'):
+    """
+    Run the script of the subcommand in argv with the rest of argv as its arguments.
+    """
+    parser = argparse.ArgumentParser(prog=prog, description='Run the MMD maintenance scripts as subcommands.')
+    add_commands(parser, commands, argv)
+    args = parser.parse_args(argv)
+    args.run(args)
+    return 0
+
+
+def main():
+    """
+    Main function running one of the scripts as a subcommand.
+    """
+    sys.exit(run(sys.argv[1:]))
+
+if __name__ == "__main__":
+    main()
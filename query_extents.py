@@ -0,0 +1,57 @@
+import sys
+import time
+from lib.cli import add_archive_arguments, run_script
+from lib.aoi import parse_aoi_argument
+from lib.discovery import get_discovery_options
+from lib.executor import get_execution_options
+from lib.index import REFRESH_HELP, MMDIndex
+
+def query(index_path, directory, product_type, aoi, outside=False, discovery=None, execution=None, refresh=True, output=None):
+    """
+    List the products whose extent intersects the area of interest (or, with outside, does not),
+    answered from the R-tree of the SQLite index of the MMD records.
+    """
+    aoi_name, geometry = aoi
+    with MMDIndex(index_path) as index:
+        if refresh:
+            print(index.refresh(directory, product_type, discovery, execution), file=sys.stderr)
+        start = time.perf_counter()
+        paths = index.query_aoi(geometry, directory, product_type, outside)
+        elapsed = time.perf_counter() - start
+
+    if output:
+        with open(output, 'w') as output_file:
+            output_file.writelines(f"{path}\n" for path in paths)
+    else:
+        sys.stdout.writelines(f"{path}\n" for path in paths)
+    relation = 'outside' if outside else 'intersecting'
+    print(f"{len(paths)} products {relation} {aoi_name} ({elapsed * 1000:.1f} ms)", file=sys.stderr)
+
+DESCRIPTION = 'List the products whose geographic extent intersects (or does not intersect) an area, using the index of the MMD records.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, instrumentation=False)
+    parser.add_argument('--index', type=str, required=True, help='SQLite index of the MMD records, created if missing')
+    parser.add_argument('--aoi', type=parse_aoi_argument, required=True, help='Area as a GeoJSON/WKT file or WKT string, or nbs/sios')
+    parser.add_argument('--outside', action='store_true', help='List the products that do not intersect the area instead')
+    parser.add_argument('--no-refresh', action='store_true', help=REFRESH_HELP)
+    parser.add_argument('--output', type=str, default=None, help='Write the paths to this file instead of standard output')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    query(args.index, args.directory, args.product_type, args.aoi, args.outside,
+          get_discovery_options(args), get_execution_options(args), not args.no_refresh, args.output)
+
+def main():
+    """
+    Main function to parse arguments and run the query.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+from lib.cli import run_script
+from lib.writeback import restore_backup
+
+DESCRIPTION = 'Put back the original records kept with --backup-dir, rolling back the run that wrote the backup archive.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    parser.add_argument('archive', type=str, help='mmd_backup_<time>.tar.gz archive of the run')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be restored')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    restored = 0
+    for filepath in restore_backup(args.archive, args.dry_run):
+        print(filepath)
+        restored += 1
+    print(f"{'Would restore' if args.dry_run else 'Restored'} {restored} files")
+
+def main():
+    """
+    Main function to parse arguments and restore the backup.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.pipeline import STEPS, get_pipeline, parse_steps
+
+def process_files(directory, product_type, step_names, discovery=None, execution=None, instrumentation=None):
+    """
+    Process XML files, applying all the steps to each file in a single read and write.
+    """
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+
+    for file_result in stats.track(process_in_parallel(xml_files, get_pipeline(step_names), **(execution or {}))):
+        if file_result.error:
+            print_failure(file_result)
+        elif file_result.result:
+            stats.count('written')
+        else:
+            stats.count('unchanged')
+    stats.finish()
+
+DESCRIPTION = 'Apply several maintenance steps to the XML files, reading and writing each file only once.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, resumable=True)
+    parser.add_argument('--steps', type=parse_steps, required=True, help=f'Comma separated steps, applied in the given order (choose from {", ".join(STEPS)})')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, args.steps, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
+
+def main():
+    """
+    Main function to parse arguments and initiate the process.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
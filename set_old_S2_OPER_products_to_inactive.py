@@ -1,43 +1,62 @@
-from lib.utils import MMD
-import argparse
-import os
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.patch import add_patch_arguments, get_patch_operation
 
-def find_S2_L1C_xml_files(directory):
+def set_to_inactive(mmd):
     """
-    Find all XML files in the metadata directory.
-    Scans all subdirectories of the given directory
-    Returns a list of filepaths to the XML files
-    Returns only S2 L1C products, S2A or S2B.
+    Read the MMD record, apply set_to_inactive and write it back if it changed.
+    A record that is Inactive already is left as it is, so that the files
+    repeated by a --resume do not get a second log_change entry.
+    Returns True if the file was written.
     """
-    xml_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".xml") and file.startswith("S2") and "OPER" in file:
-                xml_files.append(os.path.join(root, file))
-    return xml_files
+    mmd.read()
+    if mmd.get_element_text('mmd:metadata_status') == 'Inactive':
+        return False
+    mmd.set_to_inactive()
+    return mmd.write()
 
-def process_files(directory):
+def process_files(directory, discovery=None, execution=None, instrumentation=None, patch=False, verify_patch=False):
     """
     Process XML files.
+    Only S2 OPER products, S2A or S2B.
+    With patch, the changed values are patched in place (see lib.patch),
+    with verify_patch every patched file is checked against the full parse and rewrite.
     """
-    xml_files = find_S2_L1C_xml_files(directory)
+    operation = get_patch_operation('set_to_inactive', verify_patch) if patch or verify_patch else set_to_inactive
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, 'S2', contains='OPER', **(discovery or {})))
 
-    for xml_file in xml_files:
-        print(xml_file)
-        mmd = MMD(xml_file)
-        mmd.read()
-        mmd.set_to_inactive()
-        mmd.write()
+    for file_result in stats.track(process_in_parallel(xml_files, operation, **(execution or {}))):
+        if file_result.error:
+            print_failure(file_result)
+        elif file_result.result:
+            stats.count('written')
+        else:
+            stats.count('unchanged')
+    stats.finish()
+
+DESCRIPTION = 'Set the S2 OPER products to Inactive.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, product_type=False, resumable=True)
+    add_patch_arguments(parser)
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args), args.patch, args.verify_patch)
 
 def main():
     """
     Main function to parse arguments and initiate the process.
     """
-    parser = argparse.ArgumentParser(description='Process XML files to update the collection to be equal to NBS in all files.')
-    parser.add_argument('directory', type=str, help='Top level directory to search')
-
-    args = parser.parse_args()
-    process_files(args.directory)
+    run_script(DESCRIPTION, configure_parser, run)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The scripts and lib/ are imported from the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.corpus import generate_corpus  # noqa: E402
+
+
+@pytest.fixture
+def records(tmp_path):
+    """
+    A small synthetic archive (see bench/corpus.py), as the list of its MMD files.
+    """
+    return generate_corpus(tmp_path / 'archive', files=60, seed=7)
@@ -0,0 +1,57 @@
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+import mmd_manage
+
+
+def _scripts(commands=mmd_manage.COMMANDS, prefix=()):
+    for name, command in commands.items():
+        if isinstance(command, dict):
+            yield from _scripts(command, prefix + (name,))
+        else:
+            yield prefix + (name,), command[0]
+
+
+@pytest.mark.parametrize('command, module_name', list(_scripts()))
+def test_subcommand_has_the_arguments_of_the_script(command, module_name, capsys, monkeypatch):
+    module = importlib.import_module(module_name)
+    monkeypatch.setattr(sys, 'argv', [module_name, '--help'])
+    with pytest.raises(SystemExit) as direct:
+        module.main()
+    script_help = capsys.readouterr().out
+    with pytest.raises(SystemExit) as subcommand:
+        mmd_manage.run(list(command) + ['--help'])
+    subcommand_help = capsys.readouterr().out
+    assert direct.value.code == subcommand.value.code == 0
+    # Same arguments and description, only the program name differs
+    assert subcommand_help.split('\n\n', 1)[1] == script_help.split('\n\n', 1)[1]
+
+
+def test_only_the_script_run_is_imported(records, tmp_path):
+    modules = sorted(module for _, module in _scripts())
+    code = (
+        'import sys, mmd_manage\n'
+        f'mmd_manage.run(["statistics", {str(tmp_path / "archive")!r}, "S"])\n'
+        f'print([module for module in {modules!r} if module in sys.modules])\n'
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=os.path.dirname(mmd_manage.__file__))
+    assert 'Records: 60' in output.stdout
+    assert output.stdout.splitlines()[-1] == "['archive_statistics']"
+
+
+@pytest.mark.parametrize('command, resumable', [
+    ('update-collection', True),
+    ('set-status old-s2-l1c-inactive', True),
+    ('statistics', False),
+    ('export', False),
+    ('superseded', False),
+    ('query-extents', False),
+])
+def test_only_rewriting_scripts_can_resume(command, resumable, capsys):
+    with pytest.raises(SystemExit):
+        mmd_manage.run(command.split() + ['--help'])
+    assert ('--resume' in capsys.readouterr().out) == resumable
@@ -0,0 +1,107 @@
+import os
+from datetime import date
+
+import pytest
+
+from lib.discovery import find_xml_files
+
+# Mission and date directories of the tree, each with one record
+DAYS = [
+    ('S2A', '2020', '06', '30'),
+    ('S2A', '2020', '07', '01'),
+    ('S2A', '2020', '12', '31'),
+    ('S2A', '2021', '01', '01'),
+    ('S2', '2020', '07', '15'),
+    ('S2B', '2020', '07', '01'),
+    ('S1A', '2020', '07', '01'),
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """
+    An archive laid out as <mission>/<year>/<month>/<day>/metadata/<record>.
+    The records are not named like products, so the names never leave them
+    out by date: only the pruning of the directories does.
+    """
+    for mission, year, month, day in DAYS:
+        metadata = tmp_path.joinpath(mission, year, month, day, 'metadata')
+        metadata.mkdir(parents=True)
+        metadata.joinpath(f"{mission}_record_{year}{month}{day}.xml").write_text('<mmd/>')
+        # Not in a metadata directory
+        metadata.parent.joinpath(f"{mission}_other_{year}{month}{day}.xml").write_text('<mmd/>')
+    return tmp_path
+
+
+@pytest.fixture
+def scanned(monkeypatch):
+    """
+    The directories listed by the discovery.
+    """
+    paths = []
+    scandir = os.scandir
+
+    def listing(path):
+        paths.append(os.fspath(path))
+        return scandir(path)
+
+    monkeypatch.setattr(os, 'scandir', listing)
+    return paths
+
+
+def _found(tree, **options):
+    return sorted(os.path.basename(path) for path in find_xml_files(str(tree), metadata_only=True, **options))
+
+
+def test_mission_directories_are_pruned(tree, scanned):
+    assert _found(tree, product_type='S2A') == [
+        'S2A_record_20200630.xml', 'S2A_record_20200701.xml', 'S2A_record_20201231.xml', 'S2A_record_20210101.xml',
+    ]
+    # S2 can hold S2A products, S2B and S1A can not
+    missions = {os.path.relpath(path, tree).split(os.sep)[0] for path in scanned}
+    assert missions == {'.', 'S2A', 'S2'}
+
+
+def test_product_type_prefix_keeps_the_matching_missions(tree, scanned):
+    assert len(_found(tree, product_type='S2')) == 6
+    assert not any(os.path.relpath(path, tree).startswith('S1A') for path in scanned)
+
+
+@pytest.mark.parametrize('start_date, end_date, days', [
+    (date(2020, 7, 1), date(2020, 12, 31), ['20200701', '20201231']),
+    (date(2020, 7, 2), date(2020, 12, 30), []),
+    (None, date(2020, 6, 30), ['20200630']),
+    (date(2020, 12, 31), None, ['20201231', '20210101']),
+    (date(2021, 1, 1), date(2021, 1, 1), ['20210101']),
+])
+def test_date_directories_are_pruned(tree, scanned, start_date, end_date, days):
+    found = _found(tree, product_type='S2A', start_date=start_date, end_date=end_date)
+    assert found == [f"S2A_record_{day}.xml" for day in days]
+    # Every day directory listed is in the range, the end date included
+    for path in scanned:
+        parts = os.path.relpath(path, tree).split(os.sep)
+        if len(parts) >= 4:
+            day = date(*map(int, parts[1:4]))
+            assert (start_date or day) <= day <= (end_date or day), path
+
+
+def test_month_and_year_directories_outside_the_range_are_not_listed(tree, scanned):
+    _found(tree, product_type='S2A', start_date=date(2020, 7, 1), end_date=date(2020, 7, 31))
+    listed = {os.path.relpath(path, tree) for path in scanned}
+    assert os.path.join('S2A', '2020', '07') in listed
+    assert os.path.join('S2A', '2020', '06') not in listed
+    assert os.path.join('S2A', '2020', '12') not in listed
+    assert os.path.join('S2A', '2021') not in listed
+
+
+def test_files_are_yielded_while_scanning(tree, scanned):
+    files = find_xml_files(str(tree), 'S2A', metadata_only=True)
+    next(files)
+    listed_first = len(scanned)
+    list(files)
+    # The first record came before the whole tree was listed
+    assert listed_first < len(scanned)
+
+
+def test_all_records_without_metadata_only(tree):
+    assert len(list(find_xml_files(str(tree)))) == 2 * len(DAYS)
@@ -0,0 +1,79 @@
+import os
+import re
+
+import pytest
+
+import find_superseded_products
+from lib.duplicates import DatatakeGroups
+from lib.reader import read_fields
+
+
+def _reprocess(xml_file, product_identifier, created):
+    """
+    Copy the S1 record as another product of the same datatake, Active and created at created.
+    """
+    directory, name = os.path.split(xml_file)
+    copy = os.path.join(directory, f"{name[:-len('_0000.xml')]}_{product_identifier}.xml")
+    with open(xml_file) as record:
+        text = record.read()
+    text = re.sub(r'<mmd:metadata_status>\w+<', '<mmd:metadata_status>Active<', text)
+    text = re.sub(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\dZ(?=</mmd:(datetime|last_metadata_update)>)', created, text, count=1)
+    with open(copy, 'w') as record:
+        record.write(text)
+    return copy
+
+
+@pytest.fixture
+def s1_record(records):
+    return next(xml_file for xml_file in records if os.path.basename(xml_file).startswith('S1'))
+
+
+def test_s1_ties_are_broken_by_the_created_datetime(s1_record):
+    # The path would pick the older product, its identifier sorts after the newer one
+    older = _reprocess(s1_record, 'FFFF', '2001-01-01T00:00:00Z')
+    newer = _reprocess(s1_record, '0000', '2030-01-01T00:00:00Z')
+    for xml_files in ([older, newer], [newer, older]):
+        groups = DatatakeGroups()
+        assert [tuple(record) for record in groups.superseded(xml_files)] == [(older, newer, 'superseded')]
+
+
+def test_s1_products_created_together_are_undecided(s1_record):
+    first = _reprocess(s1_record, '0000', '2030-01-01T00:00:00Z')
+    second = _reprocess(s1_record, 'FFFF', '2030-01-01T00:00:00Z')
+    assert [record.reason for record in DatatakeGroups().superseded([first, second])] == ['undecided']
+
+
+def test_apply_deactivates_only_the_older_product(s1_record, tmp_path, monkeypatch):
+    older = _reprocess(s1_record, 'FFFF', '2001-01-01T00:00:00Z')
+    newer = _reprocess(s1_record, '0000', '2030-01-01T00:00:00Z')
+    os.remove(s1_record)
+    twins = [_reprocess(newer, identifier, '2031-01-01T00:00:00Z') for identifier in ('AAAA', 'BBBB')]
+    log_path = tmp_path / 'superseded.txt'
+    monkeypatch.setattr(find_superseded_products, 'get_log_file_path', lambda product_type: str(log_path))
+
+    find_superseded_products.process_files(str(tmp_path / 'archive'), 'S1', apply=True)
+
+    status = {xml_file: read_fields(xml_file, ('metadata_status',))['metadata_status'] for xml_file in [older, newer] + twins}
+    assert status == {older: 'Inactive', newer: 'Inactive', twins[0]: 'Active', twins[1]: 'Active'}
+    logged = [line.split('\t') for line in log_path.read_text().splitlines()]
+    assert sorted(reason for *_, reason in logged) == ['superseded', 'superseded', 'undecided']
+
+
+def test_undecided_products_are_superseded_by_a_newer_product(s1_record):
+    first = _reprocess(s1_record, 'AAAA', '2020-01-01T00:00:00Z')
+    second = _reprocess(s1_record, 'BBBB', '2020-01-01T00:00:00Z')
+    newer = _reprocess(s1_record, 'CCCC', '2030-01-01T00:00:00Z')
+    groups = DatatakeGroups()
+    assert [tuple(record) for record in groups.superseded([first, second, newer])] == [
+        (first, second, 'undecided'),
+        (second, newer, 'superseded'),
+        (first, newer, 'superseded'),
+    ]
+    assert not groups.undecided
+
+
+def test_names_with_impossible_dates_are_not_grouped():
+    name = 'S2A_MSIL1C_20191316T004127_N0500_R081_T36ULH_20190816T154127.xml'
+    groups = DatatakeGroups()
+    assert list(groups.superseded([name, name.replace('N0500', 'N0510')])) == []
+    assert groups.unparsed == 2
@@ -0,0 +1,112 @@
+import gzip
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import export_mmd_records
+from lib.export import parse_since
+
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    """
+    Stand-in catalog, recording every POST with the client port it came in on.
+    With close_after_first, the first connection is closed after its response
+    without telling the client, as a server dropping an idle connection would.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.posts.append((self.client_address[1], dict(self.headers), body))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        if self.server.close_after_first and len(self.server.posts) == 1:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def catalog():
+    def start(close_after_first=False):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+        server.posts = []
+        server.close_after_first = close_after_first
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/ingest"
+    servers = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def export(tmp_path, **options):
+    # The records fixture generates the archive in tmp_path / 'archive'
+    export_mmd_records.process_files(str(tmp_path / 'archive'), 'S', str(tmp_path / 'export'), **options)
+
+
+def read_batch(path):
+    with gzip.open(path, 'rt') as batch_file:
+        return [json.loads(line) for line in batch_file]
+
+
+def test_batches_are_posted_gzipped_over_one_connection(records, tmp_path, catalog):
+    server, url = catalog()
+    export(tmp_path, batch_size=25, post_url=url, headers={'Authorization': 'Bearer test'})
+
+    assert len(server.posts) == 3
+    batches = [[json.loads(line) for line in gzip.decompress(body).decode().splitlines()] for _, _, body in server.posts]
+    assert sorted(len(batch) for batch in batches) == [10, 25, 25]
+    assert sorted(record['path'] for batch in batches for record in batch) == sorted(records)
+    for _, headers, _ in server.posts:
+        assert headers['Content-Encoding'] == 'gzip'
+        assert headers['Content-Type'] == 'application/x-ndjson'
+        assert headers['Authorization'] == 'Bearer test'
+    # One connection for all the posts
+    assert len({port for port, _, _ in server.posts}) == 1
+    # The files written are the batches posted
+    written = sorted(os.listdir(tmp_path / 'export'))
+    assert len(written) == 3 and all(name.endswith('.jsonl.gz') for name in written)
+    assert [read_batch(tmp_path / 'export' / name) for name in written] == batches
+
+
+def test_post_is_retried_after_the_server_closed_the_connection(records, tmp_path, catalog):
+    server, url = catalog(close_after_first=True)
+    export(tmp_path, batch_size=25, post_url=url)
+
+    assert len(server.posts) == 3
+    assert len({port for port, _, _ in server.posts}) == 2
+
+
+def test_state_exports_only_modified_files(records, tmp_path):
+    state = str(tmp_path / 'state.json')
+    export(tmp_path, state=state)
+    assert sum(len(read_batch(tmp_path / 'export' / name)) for name in os.listdir(tmp_path / 'export')) == len(records)
+
+    later = time.time() + 10
+    for record in records[:2]:
+        os.utime(record, (later, later))
+    export(tmp_path, state=state)
+
+    # The first run's batch is kept, the second run adds its own
+    names = sorted(os.listdir(tmp_path / 'export'))
+    assert len(names) == 2
+    assert sorted(record['path'] for record in read_batch(tmp_path / 'export' / names[1])) == sorted(records[:2])
+
+
+def test_changed_since_exports_only_modified_files(records, tmp_path):
+    later = time.time() + 10
+    os.utime(records[3], (later, later))
+    since = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(time.time() + 5))
+    export(tmp_path, changed_since=parse_since(since))
+
+    names = os.listdir(tmp_path / 'export')
+    assert [record['path'] for record in read_batch(tmp_path / 'export' / names[0])] == [records[3]]
@@ -0,0 +1,42 @@
+import os
+import shutil
+
+from lib.index import MMDIndex
+
+
+def test_scope_is_a_literal_prefix(records, tmp_path):
+    # An underscore is not a wildcard: refreshing nbs_1 leaves the records of nbsX1 alone
+    for name in ('nbs_1', 'nbsX1'):
+        shutil.copytree(tmp_path / 'archive', tmp_path / name)
+    with MMDIndex(tmp_path / 'index.sqlite') as index:
+        assert index.refresh(tmp_path / 'nbsX1')['parsed'] == len(records)
+        counts = index.refresh(tmp_path / 'nbs_1')
+        assert counts['parsed'] == len(records)
+        assert counts['removed'] == 0
+        assert len(list(index.extents(tmp_path / 'nbsX1'))) == len(records)
+        assert len(list(index.extents(tmp_path / 'nbs_1'))) == len(records)
+        assert len(list(index.extents(tmp_path / 'nbs_1', 'S1A'))) == sum('/S1A_' in path for path in records)
+
+
+def test_odata_host_is_matched_literally(records, tmp_path):
+    with MMDIndex(tmp_path / 'index.sqlite') as index:
+        index.refresh(tmp_path / 'archive')
+        archive = index.with_odata_host('colhub-archive.met.no')
+        assert archive
+        assert not index.with_odata_host('colhub_archive.met.no')
+        assert not set(archive) & set(index.with_odata_host('colhub.met.no'))
+
+
+def test_refresh_writes_only_changed_records(records, tmp_path):
+    with MMDIndex(tmp_path / 'index.sqlite') as index:
+        index.refresh(tmp_path / 'archive')
+        before = dict(index.connection.execute('SELECT path, refreshed FROM records'))
+        os.remove(records[0])
+        os.utime(records[1], (0, 0))
+
+        counts = index.refresh(tmp_path / 'archive')
+
+        assert counts == {'parsed': 1, 'unchanged': len(records) - 2, 'removed': 1, 'failed': 0}
+        after = dict(index.connection.execute('SELECT path, refreshed FROM records'))
+        assert set(after) == set(before) - {records[0]}
+        assert [path for path in after if after[path] != before[path]] == [records[1]]
@@ -0,0 +1,102 @@
+import pytest
+from lxml import etree
+
+import lib.patch
+import lib.utils
+import update_last_metadata_update
+from lib.patch import PATCHES, PatchMismatch, patch_record
+from lib.utils import MMD
+
+NOW = '2030-01-01T00:00:00.000Z'
+
+
+@pytest.fixture
+def archive(records, tmp_path, monkeypatch):
+    """
+    The records, with last_metadata_update in the update entries format that
+    log_change needs, and a fixed time for the entries it adds.
+    """
+    update_last_metadata_update.process_files(str(tmp_path / 'archive'), 'S')
+    monkeypatch.setattr(lib.utils, 'get_current_time', lambda: NOW)
+    monkeypatch.setattr(lib.patch, 'get_current_time', lambda: NOW)
+    return records
+
+
+def _full(path, name):
+    """
+    The canonical XML of the record after the MMD method name, and whether it changed.
+    """
+    mmd = MMD(path)
+    mmd.read()
+    getattr(mmd, name)()
+    return etree.tostring(mmd.root, method='c14n'), mmd.modified
+
+
+def _patched(path, name, verify=False):
+    """
+    The canonical XML of the record after the byte patch (written to the file), and the MMD used.
+    """
+    mmd = MMD(path)
+    patch_record(name, verify, mmd)
+    return etree.tostring(etree.parse(path).getroot(), method='c14n'), mmd
+
+
+def _original(path):
+    with open(path, 'rb') as record:
+        return record.read()
+
+
+@pytest.mark.parametrize('name', sorted(PATCHES))
+@pytest.mark.parametrize('verify', [False, True])
+def test_patch_matches_the_full_parse(archive, name, verify):
+    changed = 0
+    for path in archive:
+        original = _original(path)
+        expected, modified = _full(path, name)
+
+        patched, mmd = _patched(path, name, verify)
+
+        assert 'fallback' not in mmd.timings, path
+        assert patched == expected, path
+        assert (_original(path) != original) == modified, path
+        changed += modified
+    assert changed
+
+
+def test_last_metadata_update_entry_is_appended(archive):
+    path = next(path for path in archive if b'>Active<' in _original(path))
+    _patched(path, 'set_to_inactive')
+    updates = MMD(path)
+    updates.read()
+    assert updates.get_last_metadata_updates()[-1] == (NOW, 'Major modification', 'Product has been deleted')
+    assert updates.get_element_text('mmd:metadata_status') == 'Inactive'
+
+
+@pytest.mark.parametrize('old, new', [
+    (b'<mmd:metadata_status>', b'<!-- checked --><mmd:metadata_status>'),
+    (b'<mmd:metadata_status>', b'<mmd:metadata_status xml:lang="en">'),
+])
+def test_unexpected_layout_falls_back_to_the_full_parse(archive, old, new):
+    path = next(path for path in archive if b'>Active<' in _original(path))
+    data = _original(path).replace(old, new)
+    with open(path, 'wb') as record:
+        record.write(data)
+    expected, modified = _full(path, 'set_to_inactive')
+    assert modified
+    with open(path, 'wb') as record:
+        record.write(data)
+
+    patched, mmd = _patched(path, 'set_to_inactive', verify=True)
+
+    assert 'fallback' in mmd.timings
+    assert patched == expected
+
+
+def test_verify_rejects_a_wrong_patch(archive, monkeypatch):
+    path = next(path for path in archive if b'>Active<' in _original(path))
+    original = _original(path)
+    monkeypatch.setitem(PATCHES, 'set_to_inactive', lambda data, mmd, now: data.replace(b'>Active<', b'>Deleted<'))
+
+    with pytest.raises(PatchMismatch):
+        patch_record('set_to_inactive', True, MMD(path))
+    assert _original(path) == original
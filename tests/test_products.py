@@ -0,0 +1,126 @@
+import os
+from datetime import date
+
+import pytest
+
+import set_old_S2_L1C_products_to_inactive
+from lib.discovery import find_xml_files
+from lib.products import Product, get_datatake, matches_product, parse_product_name
+
+S1 = 'S1A_IW_GRDH_1SDV_20190811T154021_20190811T154046_007344_6F1612_5AB8'
+S2 = 'S2A_MSIL1C_20190816T004127_N0500_R081_T36ULH_20190816T154127'
+S2_OPER = 'S2A_OPER_PRD_MSIL1C_PDMC_20150828T092228_R001_V20150827T062228_20150827T062228'
+S3 = 'S3A_OL_1_EFR____20200101T101010_20200101T101310_20200102T120000_0180_053_065_1800_MAR_O_NT_002'
+
+
+@pytest.mark.parametrize('name, product', [
+    (S1, Product('S1A', 'L1', date(2019, 8, 11), None)),
+    ('S1B_EW_GRDM_1SDH_20211231T235959_20220101T000024_030000_0393A1_0F1E', Product('S1B', 'L1', date(2021, 12, 31), None)),
+    ('S1A_IW_SLC__1SDV_20190811T154021_20190811T154046_007344_6F1612_5AB8', Product('S1A', 'L1', date(2019, 8, 11), None)),
+    (S2, Product('S2A', 'L1C', date(2019, 8, 16), '05.00')),
+    ('S2B_MSIL2A_20201231T235959_N0214_R022_T33WXS_20210101T010203', Product('S2B', 'L2A', date(2020, 12, 31), '02.14')),
+    (S2_OPER, Product('S2A', 'L1C', date(2015, 8, 27), None)),
+    (S3, Product('S3A', 'L1', date(2020, 1, 1), '002')),
+    ('S3B_SL_2_LST____20200229T101010_20200229T101310_20200301T120000_0180_053_065_1800_MAR_O_NR_004', Product('S3B', 'L2', date(2020, 2, 29), '004')),
+    # Paths of MMD files and other suffixes
+    (f'/archive/S2A/2019/08/16/metadata/{S2}.xml', Product('S2A', 'L1C', date(2019, 8, 16), '05.00')),
+    (f'{S2}.SAFE', Product('S2A', 'L1C', date(2019, 8, 16), '05.00')),
+    (f'{S3}.SEN3', Product('S3A', 'L1', date(2020, 1, 1), '002')),
+])
+def test_names_are_parsed(name, product):
+    assert parse_product_name(name) == product
+
+
+@pytest.mark.parametrize('name', [
+    '',
+    'metadata.xml',
+    'S5P_OFFL_L2__NO2____20200101T101010_20200101T115140_11571_01_010302_20200103T035224',
+    'S2E_MSIL1C_20190816T004127_N0500_R081_T36ULH_20190816T154127',
+    's2a_msil1c_20190816t004127_n0500_r081_t36ulh_20190816t154127',
+    'S2A_MSIL1C_20191316T004127_N0500_R081_T36ULH_20190816T154127',
+    'S2A_MSIL1C_20190230T004127_N0500_R081_T36ULH_20190816T154127',
+    'S2A_MSIL1C_2019081',
+    'S2A_MSIXYZ_20190816T004127_N0500_R081_T36ULH_20190816T154127',
+    'S1A_IW_GRDH_XSDV_20190811T154021_20190811T154046_007344_6F1612_5AB8',
+    'S2A_OPER_PRD_MSIL1C_PDMC_20150828T092228_R001_V20151327T062228_20150827T062228',
+])
+def test_other_names_are_not_parsed(name):
+    assert parse_product_name(name) is None
+    assert get_datatake(name) is None
+
+
+def test_datatakes_group_the_versions_of_a_product():
+    reprocessed = S2.replace('N0500', 'N0510').replace('20190816T154127', '20240101T000000')
+    assert get_datatake(S2).key == get_datatake(reprocessed).key
+    assert get_datatake(S2).version < get_datatake(reprocessed).version
+    assert get_datatake(S2).key != get_datatake(S2.replace('T36ULH', 'T36ULJ')).key
+    # S1: the last part is the product identifier, not part of the datatake
+    assert get_datatake(S1) == get_datatake(S1[:-4] + 'FFFF')
+    assert get_datatake(S1).version == ()
+    # S3: non time critical supersedes near real time, whatever the baseline
+    assert get_datatake(S3.replace('_NT_002', '_NR_004')).version < get_datatake(S3).version
+    oper = get_datatake(S2_OPER)
+    assert oper.key == get_datatake(S2_OPER.replace('20150828T092228', '20160101T000000')).key
+    assert oper.version < get_datatake(S2_OPER.replace('20150828T092228', '20160101T000000')).version
+
+
+@pytest.mark.parametrize('name, start_date, end_date, levels, matches', [
+    (S2, None, None, None, True),
+    (S2, date(2019, 8, 16), date(2019, 8, 16), None, True),
+    (S2, date(2019, 8, 17), None, None, False),
+    (S2, None, date(2019, 8, 15), None, False),
+    (S2, None, None, ('L1C',), True),
+    (S2, None, None, ('L2A',), False),
+    (S1, None, None, ('L1',), True),
+    (S2_OPER, None, date(2020, 12, 31), ('L1C',), True),
+    # The date of a name that can not be parsed is unknown, its level can not be confirmed
+    ('S2A_custom.xml', date(2030, 1, 1), None, None, True),
+    ('S2A_custom.xml', None, None, ('L1C',), False),
+])
+def test_products_are_matched(name, start_date, end_date, levels, matches):
+    assert matches_product(name, start_date, end_date, levels) == matches
+
+
+NAMES = [
+    'S2A_MSIL1C_20201231T235959_N0209_R022_T33WXS_20210101T010203',
+    'S2B_MSIL1C_20210101T000001_N0300_R022_T33WXS_20210101T010203',
+    'S2A_MSIL2A_20200601T101031_N0214_R022_T33WXS_20200601T120000',
+    'S2B_OPER_PRD_MSIL1C_PDMC_20161003T092228_R001_V20161002T062228_20161002T062228',
+    'S1A_IW_GRDH_1SDV_20190811T154021_20190811T154046_007344_6F1612_5AB8',
+    'S3A_OL_1_EFR____20200101T101010_20200101T101310_20200102T120000_0180_053_065_1800_MAR_O_NT_002',
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for name in NAMES:
+        sensing = parse_product_name(name).sensing_date
+        metadata = tmp_path.joinpath(name[:3], f"{sensing:%Y}", f"{sensing:%m}", f"{sensing:%d}", 'metadata')
+        metadata.mkdir(parents=True)
+        metadata.joinpath(f"{name}.xml").write_text('<mmd/>')
+    return tmp_path
+
+
+@pytest.mark.parametrize('discovery', [None, {'end_date': date(2022, 1, 1)}])
+def test_old_l1c_products_are_selected_by_name(tree, monkeypatch, discovery):
+    selected = []
+
+    def process_in_parallel(xml_files, operation, **execution):
+        selected.extend(os.path.basename(path)[:-len('.xml')] for path in xml_files)
+        return []
+
+    monkeypatch.setattr(set_old_S2_L1C_products_to_inactive, 'process_in_parallel', process_in_parallel)
+    set_old_S2_L1C_products_to_inactive.process_files(str(tree), discovery)
+    # Up to and including 2020, whatever the end date asked for
+    assert sorted(selected) == sorted([NAMES[0], NAMES[3]])
+
+
+@pytest.mark.parametrize('levels, expected', [
+    (('L1C',), [NAMES[0], NAMES[1], NAMES[3]]),
+    (('L2A',), [NAMES[2]]),
+    (('L1C', 'L2A'), NAMES[:4]),
+    (('L1',), [NAMES[4], NAMES[5]]),
+])
+def test_levels_are_filtered_by_name(tree, levels, expected):
+    found = [os.path.basename(path)[:-len('.xml')] for path in find_xml_files(str(tree), levels=levels)]
+    assert sorted(found) == sorted(expected)
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+import set_old_S2_L1C_products_to_inactive
+import set_old_S2_OPER_products_to_inactive
+import update_last_metadata_update
+
+
+@pytest.mark.parametrize('script', [set_old_S2_L1C_products_to_inactive, set_old_S2_OPER_products_to_inactive])
+@pytest.mark.parametrize('patch, verify_patch', [(False, False), (True, False), (True, True)])
+def test_repeated_files_are_logged_once(script, patch, verify_patch, records, tmp_path, capsys):
+    # What a --resume repeats after a crash: the files done since the last journal sync
+    directory = str(tmp_path / 'archive')
+    # log_change needs the update entries format
+    update_last_metadata_update.process_files(directory, 'S')
+    script.process_files(directory, patch=patch, verify_patch=verify_patch)
+    capsys.readouterr()
+    first = {path: open(path).read() for path in records}
+    script.process_files(directory, patch=patch, verify_patch=verify_patch)
+    assert 'Failed to process' not in capsys.readouterr().out
+
+    changed = [path for path in records if 'Product has been deleted' in first[path]]
+    assert changed
+    for path in records:
+        with open(path) as record:
+            text = record.read()
+        assert text == first[path], os.path.basename(path)
+        assert text.count('Product has been deleted') <= 1
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from lib.executor import FileResult
+from lib.writeback import BackupArchive, WriteBack, collect_writes, defer_writes, write_file
+
+
+def test_write_file_keeps_owner_and_mode(tmp_path):
+    record = tmp_path / 'record.xml'
+    record.write_bytes(b'old')
+    os.chmod(record, 0o640)
+    if os.geteuid() == 0:
+        os.chown(record, 12345, 23456)
+    before = os.stat(record)
+
+    write_file(str(record), b'new')
+
+    after = os.stat(record)
+    assert record.read_bytes() == b'new'
+    assert (after.st_mode, after.st_uid, after.st_gid) == (before.st_mode, before.st_uid, before.st_gid)
+    assert os.listdir(tmp_path) == ['record.xml']
+
+
+def test_write_file_replaces_the_target_of_a_symlink(tmp_path):
+    target = tmp_path / 'store' / 'record.xml'
+    target.parent.mkdir()
+    target.write_bytes(b'old')
+    link = tmp_path / 'record.xml'
+    link.symlink_to(target)
+
+    write_file(str(link), b'new')
+
+    assert link.is_symlink()
+    assert target.read_bytes() == b'new'
+    assert os.listdir(target.parent) == ['record.xml']
+
+
+def deferred_write(filepath, data):
+    defer_writes()
+    write_file(str(filepath), data)
+    return FileResult(str(filepath), True, None, {}, collect_writes())
+
+
+def test_failed_commit_is_not_repeated(tmp_path, monkeypatch):
+    records = []
+    for i in range(3):
+        record = tmp_path / f"record_{i}.xml"
+        record.write_bytes(b'old')
+        records.append(record)
+    added = []
+
+    def add(self, filepath):
+        added.append(filepath)
+        raise OSError('backup disk full')
+    monkeypatch.setattr(BackupArchive, 'add', add)
+
+    writeback = WriteBack('batch', str(tmp_path / 'backup'), sync_every=3)
+    with pytest.raises(OSError):
+        list(writeback.commit(deferred_write(record, b'new') for record in records))
+
+    # Given up at the first failure, nothing replaced and no temporary files left
+    assert len(added) == 1
+    assert [record.read_bytes() for record in records] == [b'old'] * 3
+    assert sorted(os.listdir(tmp_path)) == ['backup'] + [record.name for record in records]
@@ -0,0 +1,65 @@
+import shutil
+
+import pytest
+from lxml import etree
+
+import clean_mmd_records
+import update_mmd_collection
+from lib.transform import get_transform
+from lib.utils import MMD
+
+MMD_NAMESPACES = {'mmd': 'http://www.met.no/schema/mmd'}
+
+# The stylesheets and the Python code they stand in for, applied to the root of a parsed record
+PYTHON_EQUIVALENTS = {
+    'strip_data_access': [clean_mmd_records.strip_data_access],
+    'drop_landing_pages': [clean_mmd_records.drop_landing_pages],
+    'safe_file_format': [clean_mmd_records.set_safe_file_format],
+    'clean_record': [clean_mmd_records.strip_data_access, clean_mmd_records.drop_landing_pages, clean_mmd_records.set_safe_file_format],
+}
+
+
+def canonical(tree):
+    return etree.tostring(tree, method='c14n')
+
+
+def platform(tree):
+    return [canonical(element) for element in tree.getroot().iterfind('mmd:platform', MMD_NAMESPACES)]
+
+
+@pytest.mark.parametrize('stylesheet', sorted(PYTHON_EQUIVALENTS))
+def test_stylesheet_matches_python(records, stylesheet):
+    for record in records:
+        expected = etree.parse(record)
+        for function in PYTHON_EQUIVALENTS[stylesheet]:
+            function(expected.getroot())
+        original = etree.parse(record)
+        result = get_transform(stylesheet)(original)
+
+        assert canonical(result) == canonical(expected), record
+        assert etree.tostring(result, pretty_print=True) == etree.tostring(expected, pretty_print=True), record
+        assert platform(result) == platform(original) != []
+
+
+def test_stylesheets_change_the_records(records):
+    tree = get_transform('clean_record')(etree.parse(records[0]))
+    assert [element.findtext('mmd:type', namespaces=MMD_NAMESPACES) for element in tree.getroot().iterfind('mmd:data_access', MMD_NAMESPACES)] == ['ODATA']
+    assert tree.getroot().find('mmd:related_information', MMD_NAMESPACES) is None
+    assert tree.getroot().findtext('mmd:storage_information/mmd:file_format', namespaces=MMD_NAMESPACES) == 'SAFE'
+
+
+def test_set_collections_matches_python(records, tmp_path):
+    written = 0
+    for i, record in enumerate(records):
+        copy = str(tmp_path / f"xslt_{i}.xml")
+        shutil.copy(record, copy)
+        original = etree.parse(record)
+
+        written += update_mmd_collection.update_collection(MMD(record))
+        update_mmd_collection.update_collection_xslt(MMD(copy))
+
+        with open(record, 'rb') as expected, open(copy, 'rb') as result:
+            assert result.read() == expected.read(), record
+        assert platform(etree.parse(copy)) == platform(original) != []
+    # The corpus has records with wrong and missing collections
+    assert written
@@ -1,35 +1,71 @@
 import os
-from lib.utils import MMD, find_xml_files
-import argparse
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.pipeline import assign_collections
+from lib.transform import get_transform
 
-def process_files(directory, product_type):
+def update_collection(mmd):
+    """
+    Set the collections of the MMD record to NBS, and SIOS if within the SIOS region.
+    Returns True if the file was written.
+    """
+    mmd.read()
+    assign_collections(mmd)
+    return mmd.write()
+
+def update_collection_xslt(mmd):
+    """
+    As update_collection, rewriting the collections with the compiled lib/xslt/set_collections.xsl.
+    Returns True if the file was written.
+    """
+    mmd.read()
+    mmd.get_geospatial_extents()
+    collections = ['NBS', 'SIOS'] if mmd.check_if_within_sios() else ['NBS']
+    if sorted(mmd.get_collections()) != sorted(collections):
+        # add_collection inserts each collection right after dataset_production_status,
+        # so update_collection leaves them in the reverse order
+        mmd.apply_transform(get_transform('set_collections'), collections=','.join(reversed(collections)))
+    return mmd.write()
+
+def process_files(directory, product_type, discovery=None, execution=None, instrumentation=None, xslt=False):
     """
     Process XML files and update the collection to be NBS.
     """
-    xml_files = find_xml_files(directory, product_type)
+    operation = update_collection_xslt if xslt else update_collection
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+
+    for file_result in stats.track(process_in_parallel(xml_files, operation, **(execution or {}))):
+        if file_result.error:
+            print_failure(file_result)
+        elif file_result.result:
+            stats.count('written')
+        else:
+            stats.count('unchanged')
+    stats.finish()
+
+DESCRIPTION = 'Process XML files to update the collection to be equal to NBS in all files.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, resumable=True)
+    parser.add_argument('--xslt', action='store_true', help='Rewrite the collections with the compiled set_collections.xsl stylesheet')
 
-    for xml_file in xml_files:
-        print(xml_file)
-        mmd = MMD(xml_file)
-        mmd.read()
-        mmd.get_geospatial_extents()
-        within_sios = mmd.check_if_within_sios()
-        mmd.remove_element('.//mmd:collection')
-        mmd.add_collection('NBS')
-        if within_sios:
-            mmd.add_collection('SIOS')
-        mmd.write()
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args), args.xslt)
 
 def main():
     """
     Main function to parse arguments and initiate the process.
     """
-    parser = argparse.ArgumentParser(description='Process XML files to update the collection to be equal to NBS in all files.')
-    parser.add_argument('directory', type=str, help='Top level directory to search')
-    parser.add_argument('product_type', type=str, help='Product type to search for (e.g., S2A, S1A)')
-
-    args = parser.parse_args()
-    process_files(args.directory, args.product_type)
+    run_script(DESCRIPTION, configure_parser, run)
 
 if __name__ == "__main__":
     main()
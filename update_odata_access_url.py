@@ -1,30 +1,58 @@
 import os
-from lib.utils import MMD, find_xml_files
-import argparse
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.patch import add_patch_arguments, get_patch_operation
 
-def process_files(directory, product_type):
+def update_odata_access_url(mmd):
+    """
+    Read the MMD record, apply update_odata_access_url and write it back if it changed.
+    Returns True if the file was written.
+    """
+    mmd.read()
+    mmd.update_odata_access_url()
+    return mmd.write()
+
+def process_files(directory, product_type, discovery=None, execution=None, instrumentation=None, patch=False, verify_patch=False):
     """
     Process XML files
+    With patch, the changed values are patched in place (see lib.patch),
+    with verify_patch every patched file is checked against the full parse and rewrite.
     """
-    xml_files = find_xml_files(directory, product_type)
+    operation = get_patch_operation('update_odata_access_url', verify_patch) if patch or verify_patch else update_odata_access_url
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
 
-    for xml_file in xml_files:
-        print(xml_file)
-        mmd = MMD(xml_file)
-        mmd.read()
-        mmd.update_odata_access_url()
-        mmd.write()
+    for file_result in stats.track(process_in_parallel(xml_files, operation, **(execution or {}))):
+        if file_result.error:
+            print_failure(file_result)
+        elif file_result.result:
+            stats.count('written')
+        else:
+            stats.count('unchanged')
+    stats.finish()
+
+DESCRIPTION = 'Process XML files to update the odata access url to be at colhub-archive instead of colhub.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, resumable=True)
+    add_patch_arguments(parser)
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    process_files(args.directory, args.product_type, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args), args.patch, args.verify_patch)
 
 def main():
     """
     Main function to parse arguments and initiate the process.
     """
-    parser = argparse.ArgumentParser(description='Process XML files to update the odata access url to be at colhub-archive instead of colhub.')
-    parser.add_argument('directory', type=str, help='Top level directory to search')
-    parser.add_argument('product_type', type=str, help='Product type to search for (e.g., S2A, S1A)')
-
-    args = parser.parse_args()
-    process_files(args.directory, args.product_type)
+    run_script(DESCRIPTION, configure_parser, run)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,66 @@
+import functools
+import os
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.instrument import RunStats, get_instrumentation_options
+from lib.shard import get_shard_label
+from lib.validate import SCHEMA_ENVIRONMENT_VARIABLE, get_schema, get_schema_path, validate_record
+
+def get_log_file_path(product_type, label=None):
+    script_directory = os.path.dirname(os.path.abspath(__file__))
+    suffix = f"_{label}" if label else ''
+    return os.path.join(script_directory, f"invalid_records_{product_type}{suffix}.txt")
+
+def process_files(directory, product_type, schema=None, discovery=None, execution=None, instrumentation=None):
+    """
+    Validate the XML files against the MMD schema, loaded once per worker,
+    and write the invalid records and their errors to the log as they are found.
+    """
+    schema = get_schema_path(schema)
+    # Fail on a missing or broken schema before any file is processed
+    get_schema(schema)
+    stats = RunStats(**(instrumentation or {}))
+    xml_files = stats.track_discovery(find_xml_files(directory, product_type, **(discovery or {})))
+
+    with open(get_log_file_path(product_type, get_shard_label(discovery)), 'a') as log_file:
+        for file_result in stats.track(process_in_parallel(xml_files, functools.partial(validate_record, schema), **(execution or {}))):
+            if file_result.error:
+                print_failure(file_result)
+            elif file_result.result:
+                stats.count('invalid')
+                log_file.write(f"{file_result.filepath}\n")
+                for error in file_result.result:
+                    log_file.write(f"    {error}\n")
+                log_file.flush()
+            else:
+                stats.count('valid')
+    stats.finish()
+
+DESCRIPTION = 'Validate the XML files against the MMD schema and list the invalid records.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser)
+    parser.add_argument('--schema', type=str, default=None, help=f'Path to the MMD XSD (default: the {SCHEMA_ENVIRONMENT_VARIABLE} environment variable)')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    try:
+        schema = get_schema_path(args.schema)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    process_files(args.directory, args.product_type, schema, get_discovery_options(args), get_execution_options(args), get_instrumentation_options(args))
+
+def main():
+    """
+    Main function to parse arguments and initiate the process.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+import signal
+import time
+from collections import Counter
+from lib.cli import add_archive_arguments, run_script
+from lib.discovery import find_xml_files, filter_xml_files, get_discovery_options
+from lib.executor import process_in_parallel, print_failure, get_execution_options
+from lib.pipeline import STEPS, get_pipeline, parse_steps
+from lib.watch import DEFAULT_POLL_INTERVAL, InotifyWatcher, IndexPoller
+
+# Seconds a file has to be left alone before it is processed
+DEFAULT_DEBOUNCE = 5.0
+
+# Maximum number of files processed in one batch
+DEFAULT_BATCH_SIZE = 1000
+
+DEFAULT_STEPS = ['last_update', 'collection', 'odata_url']
+
+def get_watcher(directory, product_type, discovery, execution, index_path=None, poll=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Watch with inotify if possible, otherwise poll using the index.
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as error:
+            # AttributeError: no inotify functions in the C library
+            print(f"inotify not available ({error}), polling instead")
+    if index_path is None:
+        raise SystemExit('Polling needs an --index')
+    return IndexPoller(index_path, directory, product_type, discovery, execution, poll_interval)
+
+def process_batch(xml_files, pipeline, execution, written):
+    """
+    Apply the pipeline to a batch of files.
+    The mtime of every file written is kept in written, so that the events
+    caused by our own writes can be ignored.
+    """
+    counts = Counter()
+    for file_result in process_in_parallel(xml_files, pipeline, **execution):
+        if file_result.error:
+            print_failure(file_result)
+            counts['failed'] += 1
+        elif file_result.result:
+            counts['written'] += 1
+            try:
+                written[file_result.filepath] = os.stat(file_result.filepath).st_mtime_ns
+            except OSError:
+                pass
+        else:
+            counts['unchanged'] += 1
+    return counts
+
+def is_own_write(xml_file, written):
+    if xml_file not in written:
+        return False
+    try:
+        mtime = os.stat(xml_file).st_mtime_ns
+    except OSError:
+        return False
+    return written.pop(xml_file) == mtime
+
+def watch(directory, product_type, step_names, discovery=None, execution=None, index_path=None, poll=False,
+          poll_interval=DEFAULT_POLL_INTERVAL, debounce=DEFAULT_DEBOUNCE, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Apply the steps to the files below directory that are new or changed,
+    until interrupted. A file is processed once it has not changed for
+    debounce seconds, in batches of at most batch_size files.
+    """
+    discovery = discovery or {}
+    # The journal is for runs over a fixed set of files
+    execution = {key: value for key, value in (execution or {}).items() if key != 'journal'}
+    pipeline = get_pipeline(step_names)
+    watcher = get_watcher(directory, product_type, discovery, execution, index_path, poll, poll_interval)
+    pending = {}
+    written = {}
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    print(f"Watching {directory} with {type(watcher).__name__}, steps: {', '.join(step_names)}")
+    try:
+        while True:
+            try:
+                paths = watcher.wait(debounce)
+                if paths is None:
+                    print('Events were lost, checking the whole tree')
+                    paths = find_xml_files(os.path.abspath(directory), product_type, **discovery)
+                now = time.monotonic()
+                for xml_file in filter_xml_files(paths, product_type, **{key: value for key, value in discovery.items() if key != 'manifest'}):
+                    if not is_own_write(xml_file, written):
+                        pending[xml_file] = now
+            except KeyboardInterrupt:
+                # Finish what has been seen so far
+                debounce = 0.0
+                stopping = True
+            else:
+                stopping = False
+
+            now = time.monotonic()
+            ready = [xml_file for xml_file, seen in pending.items() if now - seen >= debounce]
+            for start in range(0, len(ready), batch_size):
+                batch = ready[start:start + batch_size]
+                for xml_file in batch:
+                    del pending[xml_file]
+                counts = process_batch(batch, pipeline, execution, written)
+                print(f"Processed {len(batch)} files: " + ', '.join(f"{name}: {value}" for name, value in sorted(counts.items())), flush=True)
+            if stopping:
+                return
+    finally:
+        watcher.close()
+
+DESCRIPTION = 'Watch the archive and apply maintenance steps to new or changed XML files as they arrive.'
+
+def configure_parser(parser):
+    """
+    Add the arguments of the script to the parser.
+    """
+    add_archive_arguments(parser, instrumentation=False)
+    parser.add_argument('--steps', type=parse_steps, default=DEFAULT_STEPS, help=f'Comma separated steps, applied in the given order (choose from {", ".join(STEPS)}, default: {",".join(DEFAULT_STEPS)})')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, help=f'Seconds a file must be unchanged before it is processed (default: {DEFAULT_DEBOUNCE:g})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'Maximum number of files per batch (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--poll', action='store_true', help='Poll using the --index instead of watching with inotify')
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL, help=f'Seconds between polls (default: {DEFAULT_POLL_INTERVAL:g})')
+    parser.add_argument('--index', type=str, default=None, help='SQLite index of the MMD records used for polling, created if missing')
+
+def run(args):
+    """
+    Run the script with the parsed arguments.
+    """
+    watch(args.directory, args.product_type, args.steps, get_discovery_options(args), get_execution_options(args),
+          args.index, args.poll, args.poll_interval, args.debounce, args.batch_size)
+
+def main():
+    """
+    Main function to parse arguments and start watching.
+    """
+    run_script(DESCRIPTION, configure_parser, run)
+
+if __name__ == "__main__":
+    main()